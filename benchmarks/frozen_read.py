@@ -0,0 +1,53 @@
+"""
+Benchmark for reading the options of frozen configurables (see Configurable.freeze()).
+
+Compares reads through the normal descriptor path against reads of a frozen configurable, both as attributes and directly from the dict returned by freeze().
+
+Run with: python benchmarks/frozen_read.py
+"""
+
+import timeit
+
+from configurables import Configurable, Option, Options
+
+
+class Method(Configurable):
+    
+    charge = Option(help = "Charge", type = int, default = 0)
+    functional = Option(help = "Functional", default = "B3LYP")
+    
+    dft = Options(help = "Options for density-functional theory",
+        grid = Options(
+            help = "DFT grid options",
+            size = Option(help = "Size of the DFT grid", type = int, default = 10)
+        )
+    )
+
+
+def time_reads(func, number):
+    return min(timeit.repeat(func, number = number, repeat = 5))
+
+
+def main(number = 200000):
+    obj = Method(charge = 1)
+    frozen = Method(charge = 1)
+    values = frozen.freeze()
+    
+    rows = [
+        ("flat, descriptor", time_reads(lambda: obj.charge, number)),
+        ("flat, default, descriptor", time_reads(lambda: obj.functional, number)),
+        ("nested, descriptor", time_reads(lambda: obj.dft['grid']['size'], number)),
+        ("flat, frozen", time_reads(lambda: frozen.charge, number)),
+        ("flat, default, frozen", time_reads(lambda: frozen.functional, number)),
+        ("nested, frozen", time_reads(lambda: frozen.dft['grid']['size'], number)),
+        ("flat, frozen dict", time_reads(lambda: values['charge'], number)),
+        ("nested, frozen dict", time_reads(lambda: values['dft']['grid']['size'], number)),
+    ]
+    
+    print("{} reads".format(number))
+    for name, seconds in rows:
+        print("  {:<26} {:.3f} s ({:.3f} us/read)".format(name + ":", seconds, seconds / number * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Micro-benchmark for merging config dicts.
+
+Times merging synthetic option dicts (nested dicts of scalars and lists, similar to those of partial loaders) with deepmerge.always_merger
+and with configurables.merge.merge().
+
+Run with: python benchmarks/merge.py
+"""
+
+import copy
+import time
+
+import deepmerge
+
+from configurables.merge import merge
+
+
+def make_config(width, depth, offset = 0):
+    """Make a nested config dict, with width keys at each of depth levels."""
+    config = {}
+    for index in range(width):
+        key = "option_{}".format(index + offset)
+        if depth > 1 and index % 4 == 0:
+            config[key] = make_config(width, depth -1, offset)
+        
+        elif index % 4 == 1:
+            config[key] = [index, index +1]
+        
+        else:
+            config[key] = index
+    
+    return config
+
+
+def time_merge(merge_func, base, nxt, repeats):
+    bases = [copy.deepcopy(base) for repeat in range(repeats)]
+    start = time.perf_counter()
+    for repeat_base in bases:
+        merge_func(repeat_base, nxt)
+    
+    return (time.perf_counter() - start) / repeats
+
+
+def main(shapes = ((10, 1), (10, 3), (20, 4)), repeats = 200):
+    print("{:>6} {:>6} {:>15} {:>15} {:>8}".format("width", "depth", "deepmerge (us)", "merge (us)", "speedup"))
+    for width, depth in shapes:
+        base = make_config(width, depth)
+        # About half the keys overlap with base (with the same types, so nested dicts are merged).
+        nxt = make_config(width, depth, width // 8 * 4)
+        
+        slow = time_merge(deepmerge.always_merger.merge, base, nxt, repeats)
+        fast = time_merge(merge, base, nxt, repeats)
+        print("{:>6} {:>6} {:>15.1f} {:>15.1f} {:>8.1f}".format(width, depth, slow * 1e6, fast * 1e6, slow / fast))
+
+
+if __name__ == "__main__":
+    main()
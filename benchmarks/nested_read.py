@@ -0,0 +1,76 @@
+"""
+Benchmark for nested option reads, such as obj.dft['grid']['size'].
+
+Compares reads that reuse the Options_mapping objects of the configurable (the default), against creating a new mapping at each level (using the per-class option cache of Options.get_options()),
+and against also rebuilding the inherited option tree on every access (the original behaviour).
+
+Run with: python benchmarks/nested_read.py
+"""
+
+import timeit
+
+from configurables import Configurable, Option, Options
+from configurables.options import Options_mapping
+
+
+class Parent(Configurable):
+    
+    scf = Option(help = "Options for self-consistent field", default = True, type = bool)
+    
+    dft = Options(help = "Options for density-functional theory",
+        grid = Options(
+            help = "DFT grid options",
+            size = Option(help = "Size of the DFT grid", type = int, default = 10)
+        )
+    )
+
+class Intermediate(Parent):
+    
+    dft = Options(
+        functional = Option(help = "DFT functional", default = "B3LYP")
+    )
+
+class Child(Intermediate):
+    
+    dft = Options(
+        grid = Options(
+            grid_name = Option(help = "Shorthand name of the DFT grid", default = "big")
+        )
+    )
+
+
+def time_reads(obj, number):
+    return min(timeit.repeat(lambda: obj.dft['grid']['size'], number = number, repeat = 5))
+
+
+def main(number = 20000):
+    obj = Child()
+    
+    reused = time_reads(obj, number)
+    
+    # Temporarily create a new mapping for every access.
+    get_from_dict = Options.get_from_dict
+    Options.get_from_dict = lambda self, owning_obj, dict_obj: Options_mapping(self, owning_obj, dict_obj)
+    try:
+        cached = time_reads(obj, number)
+        
+        # And also bypass the option cache.
+        get_options = Options.get_options
+        Options.get_options = lambda self, owning_cls: self.get_inherited_options(owning_cls)
+        try:
+            uncached = time_reads(obj, number)
+        
+        finally:
+            Options.get_options = get_options
+    
+    finally:
+        Options.get_from_dict = get_from_dict
+    
+    print("{} nested reads".format(number))
+    print("  uncached:        {:.3f} s ({:.2f} us/read)".format(uncached, uncached / number * 1e6))
+    print("  cached:          {:.3f} s ({:.2f} us/read)".format(cached, cached / number * 1e6))
+    print("  reused mappings: {:.3f} s ({:.2f} us/read)".format(reused, reused / number * 1e6))
+    print("  speedup:         {:.1f}x (over cached), {:.1f}x (over uncached)".format(cached / reused, uncached / reused))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Scaling benchmark for linking loaders by tag.
+
+Builds a synthetic library of n loaders (pairs of partial and single loaders, plus some updates) and times Configurables_parser.process(),
+which applies updates and links every loader, with and without the TAG index (a linear search of every loader for each tag).
+
+Run with: python benchmarks/tag_index.py
+"""
+
+import copy
+import time
+
+from configurables import Configurable_class_target
+from configurables.parse import Configurables_parser
+
+
+class Bench_methods(Configurable_class_target):
+    
+    CLASS_HANDLE = ("bench_methods",)
+
+
+def make_parser(size):
+    """Make a parser with size synthetic loaders."""
+    parser = Configurables_parser(TYPE = "bench_methods")
+    for index in range(size // 2):
+        parser.add_config({"link": {"tag": "partial {}".format(index), "type": "partial", "next": ["single {}".format(index)]}}, None)
+        parser.add_config({"link": {"tag": "single {}".format(index)}, "meta": {"name": "single {}".format(index)}}, None)
+    
+    for index in range(0, size // 2, 100):
+        parser.add_config({"link": {"tag": "single {}".format(index), "type": "update"}, "meta": {"name": "updated"}}, None)
+    
+    return parser
+
+
+def time_process(parser, indexed):
+    if not indexed:
+        # Force the linear search.
+        parser.get_tag_index = lambda: None
+    
+    start = time.perf_counter()
+    parser.process()
+    return time.perf_counter() - start
+
+
+def main(sizes = (1000, 10000, 100000), max_linear = 10000):
+    print("{:>8} {:>12} {:>12}".format("loaders", "linear (s)", "indexed (s)"))
+    for size in sizes:
+        parser = make_parser(size)
+        indexed = time_process(copy.deepcopy(parser), True)
+        linear = time_process(copy.deepcopy(parser), False) if size <= max_linear else None
+        
+        print("{:>8} {:>12} {:>12.3f}".format(size, "{:.3f}".format(linear) if linear is not None else "skipped", indexed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
-from copy import deepcopy
-import deepmerge
-import yaml
+from collections import UserDict, UserList
+from copy import deepcopy, copy as shallow_copy
 
-from configurables.exception import Configurable_exception
+from configurables import yaml_io
+from configurables.exception import Configurable_exception, Configurable_option_exception, Read_only_exception
 from configurables.parent import Dynamic_parent
 from configurables.option import Option
-from configurables.options import Options, Options_mixin
+from configurables.options import Options, Options_mixin, Frozen_mapping, Frozen_list, Frozen_set
 from configurables.util import hasopt
+from configurables.misc import copy_value, IMMUTABLE_TYPES
+from configurables.merge import merge
+from configurables.validation import get_validation_plan, is_flat_options
+from configurables.codegen import get_generated_engine, Generated_engine
 
 
 class Configurable(Options_mixin):
@@ -20,7 +24,42 @@ class Configurable(Options_mixin):
     # A useful flag for checking whether an option is a Configurable.
     is_configurable = True
     
-    def __new__(cls, *args, validate_now = True, **kwargs):
+    # How validate(), dump() and effective_values() are performed. One of:
+    #  - "plan": validation by a plan compiled once per class (see validation.py), everything else interpreted.
+    #  - "generated": generated, compiled code for each class (see codegen.py).
+    #  - "interpreted": the original, recursive path through each Option object.
+    # Classes that customise their validation fall back to the interpreted path regardless.
+    validation_engine = "plan"
+    
+    # Whether the options of this configurable can no longer be changed, see make_read_only().
+    read_only = False
+    
+    # In lazy validation mode (see __init__()), the ids of the options that have been validated so far; None once everything has been validated (or if not lazy).
+    _lazy_validated = None
+    
+    # The paths (tuples of option names) of the options that have been changed since the last successful validation, see validate().
+    # None if every option needs to be validated again (because we've never been validated, or have been changed in a way that can't be tracked).
+    _dirty_options = None
+    
+    def get_engine(self):
+        """
+        Get the compiled engine (a Validation_plan or Generated_engine) to use for this configurable.
+        
+        :returns: The engine, or None if the interpreted path should be used.
+        """
+        if self.validation_engine == "plan":
+            return get_validation_plan(type(self))
+        
+        elif self.validation_engine == "generated":
+            return get_generated_engine(type(self))
+        
+        elif self.validation_engine == "interpreted":
+            return None
+        
+        else:
+            raise Configurable_exception(self, "unknown validation engine '{}'".format(self.validation_engine))
+    
+    def __new__(cls, *args, validate_now = True, copy_options = True, **kwargs):
         instance = super().__new__(cls)
         
         # This is where the actual values for configurable options are stored.
@@ -37,7 +76,8 @@ class Configurable(Options_mixin):
             except KeyError:
                 pass
             
-        instance._configurable_options = deepcopy(values)
+        # Unless told otherwise, we take our own copy of values so changes made by the caller don't affect us (and vice versa).
+        instance._configurable_options = deepcopy(values) if copy_options else values
         
         return instance
     
@@ -48,7 +88,7 @@ class Configurable(Options_mixin):
         
         elif isinstance(data, str):
             # Assume data is yaml.
-            data = yaml.safe_load(data)
+            data = yaml_io.safe_load(data)
         
         return self(**data)
         
@@ -59,35 +99,290 @@ class Configurable(Options_mixin):
         
         :param update: The dictionary to update from.
         """
-        deepmerge.always_merger.merge(self._configurable_options, update)
+        self._option_write()
+        merge(self._configurable_options, update)
+    
+    def make_read_only(self):
+        """
+        Prevent the options of this configurable from being changed.
+        
+        Afterwards, setting or deleting options (or calling deep_merge()) will raise a Read_only_exception.
+        Note that mutable option values (lists, for example) can still be modified in place.
+        """
+        self.read_only = True
+    
+    def freeze(self, validate = True):
+        """
+        Freeze this configurable, for fast reads of options that are not going to change.
+        
+        This configurable is validated (unless validate is False) and made read-only (see make_read_only()), and the effective value of every option (including defaults) is computed once.
+        Reading an option afterwards simply returns the computed value, and nested Options become read-only dicts.
+        Values are copies, converted to read-only types where needed (lists, sets and dicts become read-only subclasses that still compare equal to the originals), so nothing can be changed in place either.
+        Calling freeze() again does nothing, and copies (see copy()) are not frozen.
+        
+        :param validate: Whether to call validate() before freezing. If False, options are frozen as they are (or as they are when validated lazily, if enabled).
+        :returns: A read-only dict of the effective value of each option. Reading values from this dict directly is faster still than reading attributes.
+        """
+        frozen = self.__dict__.get("_frozen_values")
+        if frozen is None:
+            if validate:
+                self.validate()
+            
+            self.make_read_only()
+            frozen = self.freeze_options(self.get_options(), self._configurable_options)
+            self._frozen_values = frozen
+        
+        return frozen
     
-    def __init__(self, validate_now = True, allow_unrecognised_options = False, **kwargs):
+    def freeze_options(self, options, dict_obj, path = ()):
+        """
+        Get the effective values of some options as a (nested) Frozen_mapping.
+        
+        :param options: The options to get values for.
+        :param dict_obj: The dict in which the values of the options are stored.
+        :param path: The path (a tuple of option names) of the Options object that contains options.
+        """
+        values = {}
+        for option in options.values():
+            if isinstance(option, Options):
+                values[option.name] = self.freeze_options(option.get_options(type(self)), option.get_sub_dict(dict_obj), path + (option.name,))
+            
+            else:
+                values[option.name] = self.freeze_value(option.effective_value(self, dict_obj), path + (option.name,))
+        
+        return Frozen_mapping(values, self, path)
+    
+    def freeze_value(self, value, path):
+        """
+        Get an immutable copy of the value of an option.
+        
+        :param value: The value to copy.
+        :param path: The path (a tuple of option names) of the option.
+        :returns: The value itself if it is already immutable, otherwise a copy: a Frozen_list for lists, a tuple for tuples, a Frozen_set for sets, a Frozen_mapping for dicts,
+            a copy of the same type with frozen data for UserDicts and UserLists (such as Nested_dict_type), and a deep copy for anything else.
+        """
+        if type(value) in IMMUTABLE_TYPES or isinstance(value, frozenset):
+            return value
+        
+        elif isinstance(value, list):
+            return Frozen_list([self.freeze_value(item, path) for item in value], self, path)
+        
+        elif isinstance(value, tuple):
+            return tuple(self.freeze_value(item, path) for item in value)
+        
+        elif isinstance(value, set):
+            return Frozen_set(value, self, path)
+        
+        elif isinstance(value, dict):
+            return Frozen_mapping({key: self.freeze_value(item, path) for key, item in value.items()}, self, path)
+        
+        elif isinstance(value, (UserDict, UserList)):
+            # These keep their contents in data, which every change goes through.
+            frozen = shallow_copy(value)
+            frozen.data = self.freeze_value(value.data, path)
+            return frozen
+        
+        else:
+            return copy_value(value)
+    
+    def _option_write(self, option = None):
+        """
+        Called before the value of one of our options is changed.
+        
+        :raises Read_only_exception: If we are read-only.
+        :param option: The option being changed.
+        """
+        if self.read_only:
+            raise Read_only_exception(self, option)
+        
+        if self._dirty_options is not None:
+            if option is None or isinstance(option, Options):
+                # Potentially everything has changed.
+                self._dirty_options = None
+            
+            else:
+                self._dirty_options.add(tuple(parent.name for parent in option.parents) + (option.name,))
+    
+    def copy(self):
+        """
+        Get an independent copy of this configurable.
+        
+        The values of options are copied, but the loaders this configurable was resolved from (if any) are shared with the copy.
+        Copies are never read-only (or frozen).
+        """
+        # Options are copied the quick way.
+        options = copy_value(self._configurable_options)
+        memo = {id(self._configurable_options): options}
+        frozen = self.__dict__.get("_frozen_values")
+        if frozen is not None:
+            # Not needed, the copy isn't frozen.
+            memo[id(frozen)] = None
+        
+        loader_list = getattr(self, "loader_list", None)
+        if loader_list is not None:
+            memo[id(loader_list)] = list(loader_list)
+            for loader in loader_list:
+                memo[id(loader)] = loader
+        
+        copied = deepcopy(self, memo)
+        copied.__dict__.pop("read_only", None)
+        copied.__dict__.pop("_frozen_values", None)
+        return copied
+    
+    def __init__(self, validate_now = True, allow_unrecognised_options = False, copy_options = True, **kwargs):
         """
         Constructor for Configurable objects.
         
         :param validate_now: If True, the given options will be validated before this constructor returns. Validation can also be performed at any time by calling validate().
+            If "lazy", each option is instead validated the first time it is read, while checks that involve more than one option (exclusions and unrecognised options) are left to validate().
+        :param copy_options: If False, the given option values are used as is rather than copied, so they must not be used (or changed) by anything else afterwards.
         :param **kwargs: Initial values for the Options of this configurable.
         """
         Options_mixin.__init__(self, allow_unrecognised_options = allow_unrecognised_options)
+        lazy = validate_now == "lazy"
         # If we've been asked to, validate.
-        if validate_now:
+        if lazy:
+            self._lazy_validated = set()
+        
+        elif validate_now:
             self.validate()
             
         # We also need to make sure there are no unexpected options.
         # We have to do this here because unexpected args aren't saved to the options dict,
         # so this is the last chance to handle them before they are discarded.
         if not allow_unrecognised_options:
-            for unexpected_key in set(kwargs).difference(self.get_options()):
-                # Although this looks like a loop, we will obviously only raise the first exception.
-                raise Configurable_exception(self, "unrecognised option '{}'".format(unexpected_key))
+            unexpected_keys = set(kwargs).difference(self.get_options())
+            if lazy:
+                # Remember them for validate().
+                if len(unexpected_keys) > 0:
+                    self._lazy_unrecognised = unexpected_keys
 
-    def validate(self):
+            else:
+                for unexpected_key in unexpected_keys:
+                    # Although this looks like a loop, we will obviously only raise the first exception.
+                    raise Configurable_exception(self, "unrecognised option '{}'".format(unexpected_key))
+    
+    def validate(self, full = False):
         """
         Check that all the configurable options of this configurable have been set appropriately.
         
+        Once validated, only the options that have since been set or deleted (through their Option or an Options mapping) are checked again,
+        along with the exclusions (in both directions) of each of them and of the Options that contain them, and the custom validate functions of those Options.
+        Other changes (modifying a list option in place, or changing _configurable_options directly, for example) are not tracked; use full = True to check everything regardless.
+        
         :raises Exception: If one of the Options of this configurable is invalid.
+        :param full: If True, every option is validated, even those that have not changed.
+        """
+        dirty = self._dirty_options
+        if not full and dirty is not None and self._lazy_validated is None and self.can_validate_dirty():
+            self.validate_dirty(dirty)
+        
+        else:
+            # Validation is normally performed by a plan (or generated code) that is compiled once per class.
+            engine = self.get_engine()
+            
+            if engine is not None:
+                engine.run(self)
+            
+            else:
+                self.validate_children(self, self._configurable_options)
+            
+            # Every option is now valid, so there's nothing left to validate lazily.
+            self._lazy_validated = None
+            for unexpected_key in self.__dict__.get("_lazy_unrecognised", ()):
+                raise Configurable_exception(self, "unrecognised option '{}'".format(unexpected_key))
+        
+        # Start tracking changes from here.
+        self._dirty_options = set()
+    
+    def can_validate_dirty(self):
+        """
+        Whether this configurable can be validated incrementally (see validate_dirty()), which is only possible if validation has not been customised.
+        """
+        return get_validation_plan(type(self)) is not None
+    
+    def get_option_chain(self, path):
+        """
+        Get the option at a path, along with each of the Options objects that contain it.
+        
+        :param path: A tuple of option names.
+        :returns: A list of options, the last of which is the option at path.
+        """
+        chain = []
+        options = self.get_options()
+        for name in path:
+            option = options[name]
+            chain.append(option)
+            if isinstance(option, Options):
+                options = option.get_options(type(self))
+        
+        return chain
+    
+    def validate_dirty(self, dirty):
         """
-        self.validate_children(self, self._configurable_options)
+        Validate only those options that have changed since we were last validated (along with those options that might depend on them).
+        
+        :raises Exception: If one of the changed Options is invalid.
+        :param dirty: The paths (tuples of option names) of the options that have changed.
+        """
+        chains = []
+        
+        # Sorted, so the same error is raised each time.
+        for path in sorted(dirty):
+            chain = self.get_option_chain(path)
+            
+            # The dicts in which each option in the chain is stored.
+            dict_objs = [self._configurable_options]
+            for group in chain[:-1]:
+                if not is_flat_options(group):
+                    # This group has its own way of validating its children, which we can't reproduce.
+                    return self.validate(full = True)
+                
+                dict_objs.append(group.get_sub_dict(dict_objs[-1]))
+            
+            chain[-1].validate(self, dict_objs[-1])
+            chains.append((path, chain, dict_objs))
+        
+        # Changing an option can change whether each of the Options that contain it are set, so exclusions are checked (in both directions) at every depth,
+        # followed by the custom validate function of the Options at that depth, innermost first.
+        # This is done once every changed option has been validated, because validating can reset an option to its default.
+        checked_exclusions = set()
+        checked_groups = set()
+        for path, chain, dict_objs in chains:
+            for depth in reversed(range(len(chain))):
+                if path[:depth +1] not in checked_exclusions:
+                    option = chain[depth]
+                    container = chain[depth -1] if depth > 0 else self
+                    options = container.get_options(type(self))
+                    for exclusion in option.exclude:
+                        container.check_exclusion(self, dict_objs[depth], options, option, exclusion)
+                    
+                    for other_option in options.values():
+                        if option.name in other_option.exclude:
+                            container.check_exclusion(self, dict_objs[depth], options, other_option, option.name)
+                    
+                    checked_exclusions.add(path[:depth +1])
+                
+                if depth > 0 and path[:depth] not in checked_groups:
+                    group = chain[depth -1]
+                    if not group._validate(group, self, group.get_from_dict(self, dict_objs[depth -1])):
+                        raise Configurable_option_exception(self, group, "Validation for Options object failed")
+                    
+                    checked_groups.add(path[:depth])
+    
+    def _option_read(self, option, dict_obj):
+        """
+        Called before the value of one of our (non-Options) options is read, when in lazy validation mode.
+        
+        The option is validated the first time it is read.
+        
+        :param option: The option being read.
+        :param dict_obj: The dict in which the value of the option is stored.
+        """
+        validated = self._lazy_validated
+        if validated is not None and id(option) not in validated:
+            option.validate(self, dict_obj)
+            validated.add(id(option))
     
     @property    
     def description(self):
@@ -102,6 +397,14 @@ class Configurable(Options_mixin):
         :param explicit: If True, all values will be dumped. If False, only non-default values will be dumped.
         :returns: A dumped version of this option's value.
         """
+        if self._lazy_validated is not None:
+            # Every option is needed, so validate them all now.
+            self.validate()
+        
+        engine = self.get_engine()
+        if isinstance(engine, Generated_engine):
+            return engine.dump(self, explicit)
+        
         dump = {}
         
         for option in self.get_options().values():
@@ -110,6 +413,21 @@ class Configurable(Options_mixin):
                 
         return dump
     
+    def effective_values(self):
+        """
+        Get the effective value of each option of this configurable (the explicit value if set, otherwise the default).
+        
+        :returns: A (possibly nested) dict of option values.
+        """
+        if self._lazy_validated is not None:
+            self.validate()
+        
+        engine = self.get_engine()
+        if isinstance(engine, Generated_engine):
+            return engine.effective_values(self)
+        
+        return {option.name: option.effective_value(self, self._configurable_options) for option in self.get_options().values()}
+    
     @classmethod
     def describe(self):
         """
@@ -118,7 +436,7 @@ class Configurable(Options_mixin):
         return {key: value.describe(self) for key, value in self.get_options(self).items()}
     
     def __str__(self):
-        return yaml.safe_dump(self.dump(True))
+        return yaml_io.safe_dump(self.dump(True))
     
     @classmethod
     def dump_cls_template(self):
@@ -143,6 +461,9 @@ class Configurable_class_target(Dynamic_parent, Configurable):
     A configurable object which specifies which type of class it is.
     """
         
+    # Attributes of objects that are not passed on to the classes made by classify().
+    UNINHERITED_ATTRS = ("read_only", "_frozen_values", "_dirty_options", "_lazy_validated", "_lazy_unrecognised", "_options_mappings")
+    
     # Configurable options.
     meta = Options(
         Option("name", help = "The unique name of this configurable target", type = str, required = True),
@@ -158,7 +479,7 @@ class Configurable_class_target(Dynamic_parent, Configurable):
         
         :param loader_list: If this configurable was loaded from a (number of) configurable loaders, an ordered list of those loaders.
         :param file_name: If this confiugrable was not loaded from a (number of) loaders but was loaded from a file, the name of that file.
-        :param validate_now: If True, the given options will be validated before this constructor returns. Validation can also be performed at any time by calling validate(). 
+        :param validate_now: If True, the given options will be validated before this constructor returns. Validation can also be performed at any time by calling validate(). If "lazy", options are validated as they are read (see Configurable.__init__()).
         """
         # If no class name has been set, use the class handle of this object.
         # We do this because it feels clumsy to specify class_name when constructing a configurable directly,
@@ -279,7 +600,9 @@ class Configurable_class_target(Dynamic_parent, Configurable):
         
         The new class will inherit this object's attributes as class-level attributes, so all new objects created from the class will 'share' the attributes of this object.
         """
-        cls = type(type(self).__name__ + "_actual", (self._actual, type(self)), vars(self))
+        # State that belongs to this object alone (whether it is read-only or frozen, for example) is not inherited.
+        attrs = {key: value for key, value in vars(self).items() if key not in self.UNINHERITED_ATTRS}
+        cls = type(type(self).__name__ + "_actual", (self._actual, type(self)), attrs)
         cls.__module__ = '__main__'
         return cls
     
@@ -0,0 +1,395 @@
+"""
+Caches used to speed up loading configurables; a persistent, on-disk cache of parsed yaml files, snapshots of linked loaders, and in-memory caches of resolved configurables and compiled method strings.
+"""
+
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+
+class Parse_cache():
+    """
+    Stores the parsed documents of yaml files in a cache directory, so unchanged files don't need to be parsed again.
+    
+    Each file is cached in its own entry, which records the path, modification time, size and a hash of the contents of the file that was parsed.
+    The entry is only used if all of these still match.
+    Entries are written atomically (to a temporary file which then replaces the entry), so the cache can be shared by several processes at once.
+    """
+    
+    # The version of the format of cache entries, change this to invalidate existing entries.
+    VERSION = 1
+    
+    def __init__(self, cache_dir):
+        """
+        Constructor for Parse_cache objects.
+        
+        :param cache_dir: Path to the directory to store cache entries in. It will be created if it does not exist. If it can't be created, the cache is disabled (files are always parsed).
+        """
+        self.cache_dir = cache_dir
+        # Whether the cache can be used at all.
+        self.enabled = True
+        try:
+            os.makedirs(cache_dir, exist_ok = True)
+        
+        except OSError:
+            # The cache is only ever an optimisation.
+            self.enabled = False
+    
+    def entry_path(self, file_name):
+        """
+        Get the path to the cache entry of a file.
+        
+        :param file_name: The path to the (yaml) file.
+        """
+        key = hashlib.sha1(os.path.abspath(file_name).encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".pickle")
+    
+    def load(self, file_name, parse_func):
+        """
+        Get the parsed documents of a file, either from the cache or by parsing (in which case the cache will be updated).
+        
+        :raises FileNotFoundError: If the file does not exist.
+        :param file_name: The path to the file.
+        :param parse_func: A function that will be called with the contents of the file (as bytes) to parse it (on a cache miss). It should return a list of documents, which must be picklable.
+        :returns: The list of parsed documents.
+        """
+        with open(file_name, "rb") as file:
+            stat = os.fstat(file.fileno())
+            data = file.read()
+        
+        if not self.enabled:
+            return parse_func(data)
+        
+        key = (self.VERSION, os.path.abspath(file_name), stat.st_mtime_ns, stat.st_size, hashlib.sha1(data).hexdigest())
+        entry_path = self.entry_path(file_name)
+        
+        # Try the cache first.
+        try:
+            with open(entry_path, "rb") as entry:
+                entry_key, documents = pickle.load(entry)
+            
+            if entry_key == key:
+                return documents
+        
+        except FileNotFoundError:
+            # Not cached yet.
+            pass
+        
+        except Exception:
+            # A corrupt (or incompatible) entry, treat as a miss (it will be replaced below).
+            pass
+        
+        documents = parse_func(data)
+        self.save(entry_path, key, documents)
+        return documents
+    
+    def save(self, entry_path, key, documents):
+        """
+        Atomically write a cache entry.
+        
+        :param entry_path: The path to the entry to write.
+        :param key: The key of the entry.
+        :param documents: The list of parsed documents to save.
+        """
+        atomic_pickle(entry_path, (key, documents))
+
+
+class Snapshot():
+    """
+    A single file that stores a (picklable) object, along with a fingerprint of the sources that object was built from.
+    
+    The stored object is only returned if the fingerprint still matches.
+    """
+    
+    # The version of the snapshot format, change this to invalidate existing snapshots.
+    # This should also be changed whenever the attributes of the objects being stored change.
+    VERSION = 5
+    
+    def __init__(self, file_name):
+        """
+        Constructor for Snapshot objects.
+        
+        :param file_name: Path to the snapshot file. The parent directory will be created if it does not exist.
+        """
+        self.file_name = file_name
+    
+    def load(self, fingerprint):
+        """
+        Load the object stored in this snapshot.
+        
+        :param fingerprint: The current fingerprint of the sources, this must be equal to the fingerprint the snapshot was saved with.
+        :returns: The stored object, or None if the snapshot does not exist, is out of date or cannot be read.
+        """
+        try:
+            with open(self.file_name, "rb") as file:
+                version, saved_fingerprint, obj = pickle.load(file)
+        
+        except Exception:
+            # Missing, corrupt or incompatible (for example, if a class has since been removed).
+            return None
+        
+        if version != self.VERSION or saved_fingerprint != fingerprint:
+            return None
+        
+        return obj
+    
+    def save(self, fingerprint, obj):
+        """
+        Atomically write this snapshot.
+        
+        :param fingerprint: The fingerprint of the sources obj was built from.
+        :param obj: The object to store.
+        """
+        directory = os.path.dirname(os.path.abspath(self.file_name))
+        try:
+            os.makedirs(directory, exist_ok = True)
+        
+        except OSError:
+            return
+        
+        atomic_pickle(self.file_name, (self.VERSION, fingerprint, obj))
+
+
+class Resolve_cache():
+    """
+    A bounded, thread-safe cache of resolved configurables, which discards the least recently used configurable when full.
+    
+    Cached configurables are never handed out directly; callers get either an independent copy (see Configurable.copy()),
+    or, if read_only is True, the cached configurable itself, which has been frozen (see Configurable.freeze()) so neither its options nor their values can be changed.
+    """
+    
+    def __init__(self, max_size = 128, read_only = False):
+        """
+        Constructor for Resolve_cache objects.
+        
+        :raises ValueError: If max_size is less than 1.
+        :param max_size: The maximum number of configurables to cache, or None for no limit.
+        :param read_only: Whether to hand out frozen configurables (which are shared between callers) rather than copies.
+        """
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be at least 1 (or None for no limit), not '{}'".format(max_size))
+        
+        self.max_size = max_size
+        self.read_only = read_only
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        
+        # Statistics.
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __getstate__(self):
+        """
+        Get the state of this cache for pickling, which excludes cached configurables (and the lock).
+        """
+        state = self.__dict__.copy()
+        del state['lock']
+        state['entries'] = OrderedDict()
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def get(self, key, resolve_func):
+        """
+        Get a configurable from the cache, resolving it (and adding it to the cache) if it is not cached yet.
+        
+        :param key: The key of the configurable, which must be hashable.
+        :param resolve_func: A function that will be called with no arguments to resolve the configurable on a miss.
+        :returns: A copy of the cached configurable, or the frozen configurable itself.
+        """
+        with self.lock:
+            configurable = self.entries.get(key)
+            if configurable is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            
+            else:
+                self.misses += 1
+        
+        if configurable is None:
+            # Resolve without holding the lock, so other threads aren't held up.
+            configurable = resolve_func()
+            if self.read_only:
+                # resolve_func has already validated the configurable, if it was asked to.
+                configurable.freeze(validate = False)
+            
+            with self.lock:
+                self.entries[key] = configurable
+                self.entries.move_to_end(key)
+                
+                while self.max_size is not None and len(self.entries) > self.max_size:
+                    self.entries.popitem(last = False)
+                    self.evictions += 1
+        
+        return configurable if self.read_only else configurable.copy()
+    
+    def clear(self):
+        """
+        Remove all configurables from the cache, for example because the loaders they were resolved from have been reloaded.
+        """
+        with self.lock:
+            self.entries.clear()
+    
+    def stats(self):
+        """
+        Get statistics about the use of this cache.
+        
+        :returns: A dict of the number of hits, misses and evictions, along with the current and maximum size.
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.entries), "max_size": self.max_size}
+
+
+class Method_cache():
+    """
+    A bounded, thread-safe cache of compiled method strings (the loader paths that each part of a method string resolves to), which discards the least recently used entry when full.
+    
+    Compiled paths depend on the links between loaders, so every entry is discarded when the generation of the loaders changes (see Configurable_loader.generation).
+    Method strings that could not be compiled are cached too (as UNCOMPILABLE), so they aren't compiled again every time they are used.
+    """
+    
+    # Cached (and returned by get()) in place of method strings that could not be compiled.
+    UNCOMPILABLE = object()
+    
+    def __init__(self, max_size = 1024):
+        """
+        Constructor for Method_cache objects.
+        
+        :raises ValueError: If max_size is less than 1.
+        :param max_size: The maximum number of method strings to cache, or None for no limit.
+        """
+        if max_size is not None and max_size < 1:
+            raise ValueError("max_size must be at least 1 (or None for no limit), not '{}'".format(max_size))
+        
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        # The generation of loaders that our entries were compiled from.
+        self.generation = None
+        
+        # Statistics.
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def __getstate__(self):
+        """
+        Get the state of this cache for pickling, which excludes cached entries (and the lock).
+        """
+        state = self.__dict__.copy()
+        del state['lock']
+        state['entries'] = OrderedDict()
+        state['generation'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def get(self, key, generation, compile_func):
+        """
+        Get a compiled method string from the cache, compiling it (and adding it to the cache) if it is not cached yet.
+        
+        :param key: The (normalised) method string.
+        :param generation: The current generation of loaders.
+        :param compile_func: A function that will be called with no arguments to compile the method string on a miss.
+        :returns: The compiled method string, or UNCOMPILABLE if compile_func raised an exception (for this generation of loaders).
+        """
+        with self.lock:
+            if generation != self.generation:
+                if len(self.entries) > 0:
+                    self.entries.clear()
+                    self.invalidations += 1
+                
+                self.generation = generation
+            
+            compiled = self.entries.get(key)
+            if compiled is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            
+            self.misses += 1
+        
+        try:
+            compiled = compile_func()
+        
+        except Exception:
+            compiled = self.UNCOMPILABLE
+        
+        with self.lock:
+            # Don't keep entries compiled from loaders that changed while we were compiling.
+            if generation == self.generation:
+                self.entries[key] = compiled
+                
+                while self.max_size is not None and len(self.entries) > self.max_size:
+                    self.entries.popitem(last = False)
+        
+        return compiled
+    
+    def clear(self):
+        """
+        Remove all compiled method strings from the cache.
+        """
+        with self.lock:
+            self.entries.clear()
+    
+    def stats(self):
+        """
+        Get statistics about the use of this cache.
+        
+        :returns: A dict of the number of hits, misses and invalidations (the number of times the cache was emptied because loaders changed), the hit rate (hits as a fraction of all lookups),
+            along with the current and maximum size.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "invalidations": self.invalidations,
+                "size": len(self.entries),
+                "max_size": self.max_size
+            }
+
+
+def atomic_pickle(file_name, obj):
+    """
+    Atomically pickle an object to a file.
+    
+    The object is first written to a temporary file in the same directory, which then replaces file_name, so other processes either see the old file or the new one, never a partial one.
+    Failing to write is not an error, because caches are only ever an optimisation.
+    
+    :param file_name: The path to write to.
+    :param obj: The object to pickle.
+    """
+    try:
+        file_descriptor, temp_path = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(file_name)), prefix = ".", suffix = ".tmp")
+    
+    except OSError:
+        return
+    
+    try:
+        with os.fdopen(file_descriptor, "wb") as temp_file:
+            pickle.dump(obj, temp_file, protocol = pickle.HIGHEST_PROTOCOL)
+        
+        os.replace(temp_path, file_name)
+    
+    except Exception:
+        try:
+            os.remove(temp_path)
+        
+        except OSError:
+            pass
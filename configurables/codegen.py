@@ -0,0 +1,449 @@
+"""
+Generated-code validators and accessors for Configurable classes.
+
+This is an alternative engine to the interpreted Option.validate()/Options.validate() path (and the validation plans built on top of it).
+For each Configurable class, Python source is generated for validate(), dump() and effective_values(), with option names, defaults, type functions and so on inlined as constants.
+The source is compiled once (the same approach used by attrs and dataclasses) and gives the same results and errors as the interpreted path.
+
+Only plain Option and Options objects are inlined; subclasses (which may change how values are stored or validated) are called through their normal methods.
+The generated code is a snapshot of the options at the time it was generated, so changes to Option objects after that point will not be picked up.
+
+To use this engine, set validation_engine = "generated" on a Configurable class.
+"""
+
+import linecache
+import weakref
+
+from configurables.exception import Configurable_exception,\
+    Configurable_option_exception, Missing_option_exception
+from configurables.option import Option, Nested_dict_type
+from configurables.options import Options, Options_mapping
+from configurables.validation import Validation_plan, is_flat_options,\
+    is_default_validate
+
+
+# Speed hack for get_generated_engine(), generated engines keyed by class.
+_engine_db = weakref.WeakKeyDictionary()
+
+
+def get_generated_engine(cls):
+    """
+    Get the (cached) generated engine for a Configurable class.
+    
+    :param cls: The Configurable class to get an engine for.
+    :returns: The Generated_engine, or None if the class customises validation in a way that can't be generated.
+    """
+    try:
+        return _engine_db[cls]
+    
+    except KeyError:
+        engine = Generated_engine(cls) if Validation_plan.supports(cls) else None
+        _engine_db[cls] = engine
+        return engine
+
+
+def dump_value(option, owning_obj, value):
+    """
+    Convert the value of a plain Option to its dumped form, exactly as Option.dump() does.
+    """
+    if option.dump_func is not None:
+        return option.dump_func(option, owning_obj, value)
+    
+    elif value.__class__.__module__ not in ('__builtin__', 'builtins'):
+        return str(value)
+    
+    elif option.list_type is not None:
+        return option.list_type(
+            
+            sub_value.dump() if hasattr(sub_value, "is_configurable")
+            else dict(value) if isinstance(value, Nested_dict_type)
+            else str(sub_value) if sub_value.__class__.__module__ not in ('__builtin__', 'builtins')
+            else sub_value
+            
+            for sub_value in value
+        )
+    
+    else:
+        return value
+
+
+class Generated_engine():
+    """
+    Generated (and compiled) functions to validate, dump and fill the defaults of a Configurable class.
+    
+    run() validates a configurable object (in the same way as Validation_plan.run()), while dump() and effective_values() match the methods of Configurable of the same names.
+    """
+    
+    def __init__(self, owning_cls):
+        """
+        Constructor for Generated_engine objects.
+        
+        :param owning_cls: The Configurable class to generate code for.
+        """
+        self.owning_cls = owning_cls
+        self.source, namespace = Code_generator(owning_cls).generate()
+        
+        # Compile.
+        file_name = "<configurables generated {}.{}>".format(owning_cls.__module__, owning_cls.__qualname__)
+        exec(compile(self.source, file_name, "exec"), namespace)
+        # Register our source so tracebacks are readable.
+        linecache.cache[file_name] = (len(self.source), None, self.source.splitlines(True), file_name)
+        
+        self.run = namespace['validate']
+        self.dump = namespace['dump']
+        self.effective_values = namespace['effective_values']
+
+
+class Code_generator():
+    """
+    Generates the source for a Generated_engine.
+    """
+    
+    def __init__(self, owning_cls):
+        """
+        :param owning_cls: The Configurable class to generate code for.
+        """
+        self.owning_cls = owning_cls
+        self.lines = []
+        self.level = 0
+        # Objects referenced by the generated source, keyed by the name they are referenced by.
+        self.namespace = {
+            "Configurable_exception": Configurable_exception,
+            "Configurable_option_exception": Configurable_option_exception,
+            "Missing_option_exception": Missing_option_exception,
+            "Options_mapping": Options_mapping,
+            "dump_value": dump_value,
+        }
+        # Names of constants already added, keyed by (prefix, id) of the object.
+        self.constants = {}
+    
+    def generate(self):
+        """
+        Generate our source.
+        
+        :returns: A tuple of the source (a string) and the namespace dict it should be executed in.
+        """
+        options = self.owning_cls.get_cls_options()
+        
+        self.line("def validate(owning_obj):")
+        self.level += 1
+        self.line("d0 = owning_obj._configurable_options")
+        self.line("owning_obj.prune(owning_obj, d0)")
+        self.validate_level(None, options, 0)
+        self.level -= 1
+        
+        self.line("")
+        self.line("def dump(owning_obj, explicit = False):")
+        self.level += 1
+        self.line("d0 = owning_obj._configurable_options")
+        self.line("out0 = {}")
+        self.dump_level(options, 0)
+        self.line("return out0")
+        self.level -= 1
+        
+        self.line("")
+        self.line("def effective_values(owning_obj):")
+        self.level += 1
+        self.line("d0 = owning_obj._configurable_options")
+        self.line("out0 = {}")
+        self.values_level(options, 0)
+        self.line("return out0")
+        self.level -= 1
+        
+        return "\n".join(self.lines) + "\n", self.namespace
+    
+    def line(self, text):
+        """
+        Add a line of source at the current indentation level.
+        """
+        self.lines.append("    " * self.level + text if text != "" else "")
+    
+    def const(self, obj, prefix):
+        """
+        Add an object to the namespace of the generated source.
+        
+        :param obj: The object to add.
+        :param prefix: A prefix for the name of the object, indicating what it is.
+        :returns: The name by which the object can be referenced.
+        """
+        key = (prefix, id(obj))
+        try:
+            return self.constants[key]
+        
+        except KeyError:
+            name = "{}_{}".format(prefix, len(self.constants))
+            self.constants[key] = name
+            self.namespace[name] = obj
+            return name
+    
+    def literal(self, value):
+        """
+        Get a name or literal representation for a (possibly constant) value.
+        """
+        if isinstance(value, str) or value is None or type(value) in (bool, int):
+            return repr(value)
+        
+        else:
+            return self.const(value, "CONST")
+    
+    def get_value(self, option, dict_var):
+        """
+        Generate code to get the value of a plain Option into 'value', as Option.get_from_dict() does.
+        """
+        option_name = self.const(option, "OPT")
+        
+        self.line("try:")
+        self.line("    value = {}[{}]".format(dict_var, self.literal(option.name)))
+        self.line("except KeyError:")
+        self.level += 1
+        
+        if not hasattr(option, "_default"):
+            # No value set and no default, panic.
+            self.line("raise Missing_option_exception(owning_obj, {}) from None".format(option_name))
+        
+        elif callable(option._default):
+            self.line("try:")
+            self.line("    value = {}({}, owning_obj)".format(self.const(option._default, "DEFAULT"), option_name))
+            self.line("except AttributeError:")
+            self.line("    raise Missing_option_exception(owning_obj, {}) from None".format(option_name))
+        
+        else:
+            self.line("value = {}".format(self.literal(option._default)))
+        
+        self.level -= 1
+    
+    def default_value(self, option):
+        """
+        Get an expression for the default value of a plain Option, as Option.default() does.
+        """
+        if not hasattr(option, "_default"):
+            # This will raise the same AttributeError as the interpreted path.
+            return "{}.default(owning_obj)".format(self.const(option, "OPT"))
+        
+        elif callable(option._default):
+            return "{}({}, owning_obj)".format(self.const(option._default, "DEFAULT"), self.const(option, "OPT"))
+        
+        else:
+            return self.literal(option._default)
+    
+    def validate_level(self, container, options, depth):
+        """
+        Generate code to validate one level of options, as validate_children() does.
+        
+        :param container: The Options object that contains options, or None for the top level (the configurable itself).
+        :param options: Dict of the options at this level.
+        :param depth: The nesting depth of this level.
+        """
+        dict_var = "d{}".format(depth)
+        
+        for option in options.values():
+            if type(option) is Option:
+                self.validate_option(option, dict_var)
+            
+            elif is_flat_options(option):
+                self.validate_options(option, depth)
+            
+            else:
+                self.line("{}.validate(owning_obj, {})".format(self.const(option, "OPT"), dict_var))
+        
+        # Exclusions.
+        for option in options.values():
+            for exclusion in option.exclude:
+                if exclusion not in options:
+                    self.line("raise Configurable_option_exception(owning_obj, {}, {})".format(
+                        self.const(option, "OPT"),
+                        self.literal("The option '{}' in exclude cannot be found".format(exclusion))
+                    ))
+                    # Nothing after this will be reached.
+                    return
+                
+                self.line("if not {} and not {}:".format(self.is_default(options[exclusion], dict_var), self.is_default(option, dict_var)))
+                self.line("    raise Configurable_exception(owning_obj, {})".format(
+                    self.literal("options '{}' and '{}' cannot be set at the same time (mutually exclusive)".format(option.name, exclusion))
+                ))
+        
+        # Unrecognised options.
+        known = self.const(frozenset(options), "KNOWN")
+        if container is None:
+            # Whether the configurable itself allows unrecognised options can change per object.
+            self.line("if not owning_obj.allow_unrecognised_options:")
+            self.level += 1
+            self.line("for unexpected_key in set({}).difference({}):".format(dict_var, known))
+            self.line("    msg = \"unrecognised option '{{}}' with value '{{}}'\".format(unexpected_key, {}[unexpected_key])".format(dict_var))
+            self.line("    raise Configurable_exception(owning_obj, msg)")
+            self.level -= 1
+        
+        elif not container.allow_unrecognised_options:
+            self.line("for unexpected_key in set({}).difference({}):".format(dict_var, known))
+            self.line("    msg = \"unrecognised option '{{}}' with value '{{}}'\".format(unexpected_key, {}[unexpected_key])".format(dict_var))
+            self.line("    raise Configurable_option_exception(owning_obj, {}, msg)".format(self.const(container, "OPT")))
+    
+    def is_default(self, option, dict_var):
+        """
+        Get an expression for whether an option is currently set to default.
+        """
+        if type(option) is Option:
+            return "{} not in {}".format(self.literal(option.name), dict_var)
+        
+        else:
+            return "{}.is_default(owning_obj, {})".format(self.const(option, "OPT"), dict_var)
+    
+    def validate_options(self, option, depth):
+        """
+        Generate code to validate an Options object and its children, as Options.validate() does.
+        """
+        dict_var = "d{}".format(depth)
+        sub_dict_var = "d{}".format(depth +1)
+        option_name = self.const(option, "OPT")
+        
+        self.line("{} = {}.get({}, {{}})".format(sub_dict_var, dict_var, self.literal(option.name)))
+        self.line("if isinstance({}, Options_mapping):".format(sub_dict_var))
+        self.line("    {}[{}] = dict({})".format(dict_var, self.literal(option.name), sub_dict_var))
+        self.line("    {}.prune(owning_obj, {})".format(option_name, sub_dict_var))
+        self.line("elif not isinstance({}, dict):".format(sub_dict_var))
+        self.line("    raise Configurable_option_exception(owning_obj, {}, \"Options objects can only accept nested options as values, not the single value '{{}}'\".format({}))".format(option_name, sub_dict_var))
+        
+        self.validate_level(option, option.get_options(self.owning_cls), depth +1)
+        
+        if not is_default_validate(option):
+            self.line("if not {}._validate({}, owning_obj, {}.get_from_dict(owning_obj, {})):".format(option_name, option_name, option_name, dict_var))
+            self.line("    raise Configurable_option_exception(owning_obj, {}, \"Validation for Options object failed\")".format(option_name))
+    
+    def validate_option(self, option, dict_var):
+        """
+        Generate code to validate a plain Option, as Option.validate() does.
+        """
+        option_name = self.const(option, "OPT")
+        name = self.literal(option.name)
+        
+        self.line("# {}".format(option.full_name))
+        self.get_value(option, dict_var)
+        
+        # None handling.
+        if option.none_to_default:
+            self.line("if value is None:")
+            self.line("    {}.pop({}, None)".format(dict_var, name))
+        
+        elif option.no_none:
+            self.line("if value is None:")
+            self.line("    {}.pop({}, None)".format(dict_var, name))
+            self.line("    raise Configurable_option_exception(owning_obj, {}, \"value cannot be None\")".format(option_name))
+        
+        # Type conversion.
+        self.line("if {} in {} and value is not None:".format(name, dict_var))
+        self.level += 1
+        
+        if option.list_type is not None:
+            list_type = self.const(option.list_type, "LIST_TYPE")
+            self.line("try:")
+            self.line("    temp_list = list(value)")
+            self.line("except (TypeError, ValueError) as e:")
+            self.line("    raise Configurable_option_exception(owning_obj, {}, \"value '{{}}' of type '{{}}' could not be converted to list\".format(value, type(value).__name__)) from e".format(option_name))
+            
+            if option.type_func is not None:
+                self.line("for index, element in enumerate(temp_list):")
+                self.line("    try:")
+                self.line("        temp_list[index] = {}({}, owning_obj, element) if element is not None else element".format(self.const(option.type_func, "TYPE_FUNC"), option_name))
+                self.line("    except (TypeError, ValueError) as e:")
+                self.line("        raise Configurable_option_exception(owning_obj, {}, \"item '{{}}') '{{}}' of type '{{}}' is of invalid type\".format(index, element, type(element).__name__)) from e".format(option_name))
+            
+            self.line("try:")
+            self.line("    value = {}(temp_list)".format(list_type))
+            self.line("except (TypeError, ValueError) as e:")
+            self.line("    raise Configurable_option_exception(owning_obj, {}, \"value '{{}}' of type '{{}}' could not be converted to the list-like type '{{}}'\".format(temp_list, type(temp_list).__name__, {})) from e".format(option_name, list_type))
+        
+        elif option.type_func is not None:
+            self.line("try:")
+            self.line("    value = {}({}, owning_obj, value)".format(self.const(option.type_func, "TYPE_FUNC"), option_name))
+            self.line("except (TypeError, ValueError) as e:")
+            self.line("    raise Configurable_option_exception(owning_obj, {}, \"value '{{}}' of type '{{}}' is of invalid type\".format(value, type(value).__name__)) from e".format(option_name))
+        
+        self.line("{}[{}] = value".format(dict_var, name))
+        self.level -= 1
+        
+        # Choices.
+        if len(option.choices) != 0:
+            validate_choices = self.const(option.validate_choices, "CHOICES")
+            if option.list_type is not None:
+                self.line("new_values = []")
+                self.line("try:")
+                self.line("    for sub_value in value:")
+                self.line("        new_values.append({}(sub_value, owning_obj, {}))".format(validate_choices, dict_var))
+                self.line("except TypeError as e:")
+                self.line("    raise Configurable_option_exception(owning_obj, {}, \"value '{{}}' is not iterable\".format(value))".format(option_name))
+                self.line("value = new_values")
+            
+            else:
+                self.line("value = {}(value, owning_obj, {})".format(validate_choices, dict_var))
+            
+            self.line("{}[{}] = value".format(dict_var, name))
+        
+        # Custom validation.
+        if not is_default_validate(option):
+            self.line("if not {}({}, owning_obj, value):".format(self.const(option._validate, "VALIDATE"), option_name))
+            self.line("    raise Configurable_option_exception(owning_obj, {}, \"value '{{}}' of type '{{}}' is invalid\".format(value, type(value).__name__))".format(option_name))
+        
+        # Values equivalent to the default are removed.
+        if not option.required:
+            self.line("if value == {}:".format(self.default_value(option)))
+            self.line("    {}.pop({}, None)".format(dict_var, name))
+    
+    def dump_level(self, options, depth):
+        """
+        Generate code to dump one level of options, as Configurable.dump() and Options.dump() do.
+        """
+        dict_var = "d{}".format(depth)
+        out_var = "out{}".format(depth)
+        
+        for option in options.values():
+            name = self.literal(option.name)
+            
+            if type(option) is Option:
+                self.line("if explicit or {} in {}:".format(name, dict_var))
+                self.level += 1
+                self.get_value(option, dict_var)
+                self.line("{}[{}] = dump_value({}, owning_obj, value)".format(out_var, name, self.const(option, "OPT")))
+                self.level -= 1
+            
+            elif type(option) is Options:
+                self.line("if explicit or not {}.is_default(owning_obj, {}):".format(self.const(option, "OPT"), dict_var))
+                self.level += 1
+                self.nested_level(option, depth, self.dump_level)
+                self.level -= 1
+            
+            else:
+                option_name = self.const(option, "OPT")
+                self.line("if explicit or not {}.is_default(owning_obj, {}):".format(option_name, dict_var))
+                self.line("    {}[{}] = {}.dump(owning_obj, {}, explicit = explicit)".format(out_var, name, option_name, dict_var))
+    
+    def values_level(self, options, depth):
+        """
+        Generate code to get the effective value of each option at one level, as Option.effective_value() does.
+        """
+        dict_var = "d{}".format(depth)
+        out_var = "out{}".format(depth)
+        
+        for option in options.values():
+            if type(option) is Option:
+                self.get_value(option, dict_var)
+                self.line("{}[{}] = value".format(out_var, self.literal(option.name)))
+            
+            elif type(option) is Options:
+                self.nested_level(option, depth, self.values_level)
+            
+            else:
+                self.line("{}[{}] = {}.effective_value(owning_obj, {})".format(out_var, self.literal(option.name), self.const(option, "OPT"), dict_var))
+    
+    def nested_level(self, option, depth, level_func):
+        """
+        Generate code for the children of a plain Options object (for dumping or effective values), storing the result in the output dict of the current level.
+        """
+        children = option.get_options(self.owning_cls)
+        
+        # The sub dict is only fetched (and so possibly created) if there are children to look in.
+        if len(children) > 0:
+            self.line("d{} = {}.get_sub_dict(d{})".format(depth +1, self.const(option, "OPT"), depth))
+        
+        self.line("out{} = {{}}".format(depth +1))
+        level_func(children, depth +1)
+        self.line("out{}[{}] = out{}".format(depth, self.literal(option.name), depth +1))
@@ -94,6 +94,28 @@ class Missing_option_exception(Configurable_option_exception, AttributeError):
         """
         super().__init__(configurable, option, "a value is required but has not been set")
         AttributeError.__init__(self)
+
+
+class Read_only_exception(Configurable_exception, AttributeError):
+    """
+    Exception raised when trying to change the options of a read-only Configurable object.
+    """
+    
+    def __init__(self, configurable, option = None):
+        """
+        Constructor for Read_only_exceptions.
+        
+        :param configurable: The read-only Configurable object.
+        :param option: The option that was being changed (if known).
+        """
+        if option is not None:
+            reason = "cannot change option '{}'; this configurable is read-only".format(option.full_name)
+        
+        else:
+            reason = "cannot change options; this configurable is read-only"
+        
+        super().__init__(configurable, reason)
+        AttributeError.__init__(self)
     
 
 class Configurable_loader_exception(Exception):
@@ -0,0 +1,165 @@
+"""
+Copy-on-write dicts, which are layered on top of other (shared) dicts.
+"""
+
+from collections.abc import KeysView, ItemsView, ValuesView
+
+from configurables.misc import copy_value, IMMUTABLE_TYPES
+
+
+class Layered_dict(dict):
+    """
+    A dict that is layered on top of another, read-only mapping (the parent).
+    
+    Reads fall through to the parent for keys that have not been set in this layer, while writes (and deletions) only ever change this layer, so one parent can be shared by any number of layered dicts.
+    Nested dicts from the parent are themselves layered when first read (so they are also copy-on-write), while other mutable values (lists, for example) are copied when first read, because changes made to them in place can't be detected.
+    
+    The parent must not be modified while layers on top of it are in use.
+    
+    This class is a dict (so it can be used anywhere a dict is expected), but values set in the parent are only visible through the methods of this class, not through the dict C API (which is used by json, for example).
+    Layered dicts should therefore not be handed out; use to_dict() to get a real (nested) dict.
+    """
+    
+    __slots__ = ("parent", "deleted")
+    
+    def __init__(self, parent, *args, **kwargs):
+        """
+        Constructor for Layered_dict objects.
+        
+        :param parent: The mapping to layer on top of.
+        :param args: Initial values for this layer, as for dict().
+        """
+        super().__init__(*args, **kwargs)
+        self.parent = parent
+        # Keys of the parent that have been deleted from this layer (created when first needed).
+        self.deleted = None
+    
+    def __getitem__(self, key):
+        try:
+            return dict.__getitem__(self, key)
+        
+        except KeyError:
+            if self.deleted and key in self.deleted:
+                raise
+        
+        value = self.parent[key]
+        
+        if type(value) in IMMUTABLE_TYPES:
+            return value
+        
+        # Anything else needs its own copy (or layer) in this layer, in case it is changed.
+        value = Layered_dict(value) if isinstance(value, dict) else copy_value(value)
+        return dict.setdefault(self, key, value)
+    
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        if self.deleted:
+            self.deleted.discard(key)
+    
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        
+        dict.pop(self, key, None)
+        if key in self.parent:
+            if self.deleted is None:
+                self.deleted = set()
+            
+            self.deleted.add(key)
+    
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or (not (self.deleted and key in self.deleted) and key in self.parent)
+    
+    def __iter__(self):
+        # Keys from the parent come first, the same order as if this layer had been merged into a copy of the parent.
+        deleted = self.deleted or ()
+        for key in self.parent:
+            if key not in deleted:
+                yield key
+        
+        for key in dict.__iter__(self):
+            if key not in self.parent:
+                yield key
+    
+    def __len__(self):
+        return sum(1 for key in self)
+    
+    def __eq__(self, other):
+        return dict(self.items()) == other
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return repr(dict(self.items()))
+    
+    def __reduce_ex__(self, protocol):
+        # Layered dicts are pickled (and copied) as real dicts.
+        return (dict, (list(self.items()),))
+    
+    def __deepcopy__(self, memo):
+        return {key: copy_value(value) for key, value in self.items()}
+    
+    def keys(self):
+        return KeysView(self)
+    
+    def items(self):
+        return ItemsView(self)
+    
+    def values(self):
+        return ValuesView(self)
+    
+    def get(self, key, default = None):
+        try:
+            return self[key]
+        
+        except KeyError:
+            return default
+    
+    def setdefault(self, key, default = None):
+        try:
+            return self[key]
+        
+        except KeyError:
+            self[key] = default
+            return default
+    
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        
+        except KeyError:
+            if len(default) > 0:
+                return default[0]
+            
+            raise
+        
+        del self[key]
+        return value
+    
+    def popitem(self):
+        for key in self:
+            return key, self.pop(key)
+        
+        raise KeyError("popitem(): dictionary is empty")
+    
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+    
+    def clear(self):
+        dict.clear(self)
+        self.deleted = set(self.parent)
+    
+    def copy(self):
+        return dict(self.items())
+    
+    def to_dict(self):
+        """
+        Get a real dict of the values in this layer (including those of the parent), in which nested layered dicts are also converted to real dicts.
+        
+        :returns: The dict, which shares nothing with the parent.
+        """
+        return {key: value.to_dict() if isinstance(value, Layered_dict) else value for key, value in self.items()}
@@ -5,15 +5,80 @@ Loaders construct real Configurable_class_target objects from one or more dict o
 Loaders are essentially a speed hack that means we don't have to construct 1000s of objects each time we start up.
 """
 
-import deepmerge
 import copy
+from bisect import bisect_right
 
 from configurables.exception import Configurable_loader_exception,\
     Short_tag_path_error, Unresolvable_tag_path_error, Long_tag_path_error
 from configurables.base import Configurable_class_target
 from configurables.util import setopt, getopt, hasopt
 from configurables.identifier import Identifier
-from configurables.misc import is_iter, is_int
+from configurables.misc import is_iter, is_int, copy_value
+from configurables.layered import Layered_dict
+from configurables.merge import merge
+from configurables.cache import Method_cache
+
+
+def copy_config(config):
+    """
+    Copy a (partially) merged config dict, as built when resolving a loader path.
+    
+    The config is deep copied, except for the list of loaders it was merged from (loader_path) which is copied shallowly.
+    """
+    return {key: list(value) if key == 'loader_path' else copy_value(value) for key, value in config.items()}
+
+
+def normalise_method_string(identifier):
+    """
+    Normalise a string which identifies a complete method, by removing the whitespace around each of its parts.
+    
+    :param identifier: The identifier string.
+    :returns: The normalised string (or identifier unchanged if it is not a string).
+    """
+    if not isinstance(identifier, str):
+        return identifier
+    
+    return "/".join(part.strip() for part in identifier.split("/"))
+
+
+def path_offsets(path):
+    """
+    Get the total size of the loaders before the last loader of a path, in the tree of the first loader of the path.
+    
+    A path can occur more than once in a tree (if a loader appears more than once in the NEXT of its parent), so there is one offset for each place the path occurs.
+    For complete paths, the first offset is one less than the index of the path (see Partial_loader.index_of_path()).
+    
+    :param path: A loader path, a list of configurable loaders.
+    :returns: A list of offsets, in ascending order (which is empty if the path no longer exists).
+    """
+    totals = [0]
+    for parent, child in zip(path, path[1:]):
+        offsets, positions = parent.child_offsets()
+        if len(positions) == len(parent.NEXT):
+            # No repeated children, so there's only one place child can be.
+            child_positions = [positions[child]] if child in positions else []
+        
+        else:
+            child_positions = [position for position, loader in enumerate(parent.NEXT) if loader is child]
+        
+        totals = [total + offsets[position] for total in totals for position in child_positions]
+    
+    return totals
+
+
+def validation_error(configurable):
+    """
+    Validate a configurable.
+    
+    :returns: The exception raised by validate(), or None if the configurable is valid.
+    """
+    try:
+        configurable.validate()
+    
+    except Exception as e:
+        return e
+    
+    return None
 
 
 class Depth_exception(Exception):
@@ -25,6 +90,172 @@ class Depth_exception(Exception):
     pass
 
 
+class Unindexable_exception(Exception):
+    """
+    An exception used by tag_index() to indicate that a tree of loaders cannot be indexed (because it contains an unhashable tag or a cycle).
+    """
+    pass
+
+
+class Loader_list(list):
+    """
+    A list of child loaders, used for the NEXT attribute of loaders.
+    
+    Modifying the list clears the information cached by the loader that owns it (see Configurable_loader.clear_caches()).
+    """
+    
+    def __init__(self, loaders = (), owner = None):
+        """
+        Constructor for Loader_list objects.
+        
+        :param loaders: The loaders in the list.
+        :param owner: The loader whose NEXT this list is.
+        """
+        super().__init__(loaders)
+        self.owner = owner
+        self.changed(self)
+    
+    def changed(self, added = ()):
+        """
+        Called whenever this list is modified.
+        
+        :param added: Loaders that have been added to the list.
+        """
+        # The owner is not set yet while unpickling.
+        owner = self.__dict__.get("owner")
+        if owner is None:
+            return
+        
+        for loader in added:
+            loader.add_parent(owner)
+        
+        owner.clear_caches()
+    
+    def append(self, loader):
+        super().append(loader)
+        self.changed((loader,))
+    
+    def extend(self, loaders):
+        loaders = list(loaders)
+        super().extend(loaders)
+        self.changed(loaders)
+    
+    def insert(self, index, loader):
+        super().insert(index, loader)
+        self.changed((loader,))
+    
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = list(value)
+        
+        super().__setitem__(index, value)
+        self.changed(value if isinstance(index, slice) else (value,))
+    
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.changed()
+    
+    def __iadd__(self, loaders):
+        self.extend(loaders)
+        return self
+    
+    def __imul__(self, value):
+        super().__imul__(value)
+        self.changed()
+        return self
+    
+    def pop(self, *args):
+        loader = super().pop(*args)
+        self.changed()
+        return loader
+    
+    def remove(self, loader):
+        super().remove(loader)
+        self.changed()
+    
+    def clear(self):
+        super().clear()
+        self.changed()
+    
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.changed()
+    
+    def reverse(self):
+        super().reverse()
+        self.changed()
+
+
+class Child_path_list(Loader_list):
+    """
+    A list of paths to child loaders, used for the CHILDREN attribute of single loaders.
+    
+    Modifying the list clears the index of child paths of the loader that owns it (see Single_loader.child_trie()).
+    Paths in the list should not be modified in place.
+    """
+    
+    def changed(self, added = ()):
+        """
+        Called whenever this list is modified.
+        
+        :param added: Paths that have been added to the list.
+        """
+        owner = self.__dict__.get("owner")
+        if owner is None:
+            return
+        
+        owner.__dict__.pop("_child_trie", None)
+        # Our paths are not (and don't change) the parents of any loaders, so other caches are unaffected.
+        Configurable_loader.generation += 1
+
+
+class Tag_index():
+    """
+    An index of a list of loaders by their TAG, for finding loaders with a given tag without searching through the entire list.
+    """
+    
+    def __init__(self, loaders):
+        """
+        Constructor for Tag_index objects.
+        
+        :param loaders: A flat list of loaders to index. The index is only valid until this list (or the TAGs of its loaders) change.
+        """
+        self.loaders = loaders
+        # The number of loaders we indexed.
+        self.size = len(loaders)
+        # Lists of loaders (in the same order as loaders), keyed by TAG.
+        self.index = {}
+        # Loaders whose TAG cannot be indexed (because it is unhashable).
+        self.unhashable = False
+        
+        for loader in loaders:
+            try:
+                self.index.setdefault(loader.TAG, []).append(loader)
+            
+            except TypeError:
+                self.unhashable = True
+    
+    def find(self, tag):
+        """
+        Find all the loaders with a given tag.
+        
+        This is equivalent to [loader for loader in loaders if loader.TAG == tag].
+        
+        :param tag: The tag to search for.
+        :returns: A list of matching loaders, in the same order as the indexed list (this list should not be modified).
+        """
+        if self.unhashable:
+            # We can't use the index.
+            return [loader for loader in self.loaders if loader.TAG == tag]
+        
+        try:
+            return self.index.get(tag, [])
+        
+        except TypeError:
+            # An unhashable tag, which can't be equal to any of ours.
+            return []
+
+
 class Configurable_loader():
     """
     Abstract top-level class for configurable loaders.
@@ -33,6 +264,56 @@ class Configurable_loader():
     # Whether this loader is a partial loader (a partial loader is any that is not a Single Loader).
     partial = True
     
+    # Attributes that store information cached about the tree of loaders under a loader, see clear_caches().
+    cache_attrs = ("_tag_index", "_size", "_child_offsets", "_merged_prefixes", "_method_count", "_concrete_children")
+    
+    # Incremented whenever the links between any loaders change, so information cached about more than one tree of loaders (see Method_cache) is not reused.
+    generation = 0
+    
+    @property
+    def NEXT(self):
+        """
+        A list of the next loaders in the chain. For single loaders, len(self.NEXT) == 0.
+        """
+        return self._NEXT
+    
+    @NEXT.setter
+    def NEXT(self, value):
+        self._NEXT = Loader_list(value, owner = self)
+        self.clear_caches()
+    
+    @property
+    def config(self):
+        """
+        The config options at this node.
+        
+        If this dict is modified in place, config_changed() should be called afterwards.
+        """
+        return self._config
+    
+    @config.setter
+    def config(self, value):
+        self._config = value
+        self.config_changed()
+    
+    def config_changed(self):
+        """
+        Called whenever the config options of this loader are changed, so merged configs that were cached from the old options are not used.
+        """
+        self.config_version = self.__dict__.get("config_version", 0) + 1
+        
+        # Whether we are hidden from lists of options (see get_concrete_children()).
+        try:
+            hidden = bool(self.config.get("meta", {}).get("hidden", False))
+        
+        except (AttributeError, TypeError):
+            # A malformed meta section, which is reported when we are resolved.
+            hidden = False
+        
+        if hidden != self.__dict__.get("hidden"):
+            self.hidden = hidden
+            # Cached lists of children that include us are now wrong.
+            Configurable_loader.generation += 1
     
     @property
     def ALIAS(self):
@@ -78,6 +359,9 @@ class Configurable_loader():
         # Get our TYPE class.
         self.type_class = Configurable_class_target.from_class_handle(self.TYPE)
         
+        # Loaders that have us in their NEXT.
+        self._parents = set()
+        
         # A list of the next loaders in the chain. For single loaders, len(self.NEXT) == 0.
         self.NEXT = []
         
@@ -87,6 +371,41 @@ class Configurable_loader():
         # Check our tag name is valid (does not contain / or :).
         if self.TAG is not None and  ("/" in self.TAG or ":" in self.TAG):
             raise Configurable_loader_exception(self.config, self.TYPE, self.file_name, "the '/' and ':' characters are not allowed in link:tag names")
+    
+    def __getstate__(self):
+        """
+        Get the state of this loader for pickling (or copying), which excludes cached information.
+        """
+        state = self.__dict__.copy()
+        for attr in self.cache_attrs:
+            state.pop(attr, None)
+        
+        return state
+    
+    def add_parent(self, parent):
+        """
+        Register a loader that has this loader as a child (in its NEXT).
+        """
+        # This can be called before our state has been restored when unpickling/copying.
+        self.__dict__.setdefault("_parents", set()).add(parent)
+    
+    def clear_caches(self):
+        """
+        Clear information cached about the tree of loaders under this loader, because that tree has changed.
+        
+        Caches of the loaders above this one (which depend on ours) are also cleared.
+        """
+        Configurable_loader.generation += 1
+        
+        cleared = False
+        for attr in self.cache_attrs:
+            if self.__dict__.pop(attr, None) is not None:
+                cleared = True
+        
+        # If we had nothing cached, neither will any of our parents.
+        if cleared:
+            for parent in self.__dict__.get("_parents", ()):
+                parent.clear_caches()
         
     def __iter__(self):
         """
@@ -111,60 +430,74 @@ class Configurable_loader():
         """
         return [[child] for child in self.NEXT]
     
-    def get_concrete_children(self, show_hidden = False, _concrete_children = None, _current_path = None):
+    def get_concrete_children(self, show_hidden = False):
         """
         Get a list of the children of this loader that are concrete.
         
         Concrete here means that the child would appear as a node in a list of options, ie is not pseudo or similar.
-        This method is recursive, any direct children that are not concrete (they are pseudo) will also have get_concrete_children() called.
+        Any direct children that are not concrete (they are pseudo) are replaced by their own concrete children.
         
-        All parameters to this method are only used when called recursively; they should not normally be specified by the user.
+        The paths are cached (for each value of show_hidden) until the links between any loaders change, see iter_concrete_children() to walk them lazily instead.
         
         :param show_hidden: Whether to include hidden loaders.
-        :param _concrete_children: The current list of concrete children.
-        :param _current_path: A list of pseudo loaders that have already been traversed up to this point.
         :returns: A list of paths to concrete children. Each 'path' is itself a list of loaders which if traversed will lead to the concrete child.
                   Only the last element in the list will be a non-pseudo loader, while all others will be a pseudo loader.
                   If a direct child of this loader is concrete, then the 'path' will be a list containing a single element (which will be that direct child).
                   
         """
-        concrete_children = [] if _concrete_children is None else _concrete_children
-        if _current_path is None:
-            current_path = []
+        return [list(path) for path in self.concrete_children(show_hidden)]
             
-        else:
-            # We need to make a new list.
-            current_path = list(_current_path)
+    def concrete_children(self, show_hidden = False):
+        """
+        Get the (cached) paths to the concrete children of this loader, see get_concrete_children().
+        
+        :param show_hidden: Whether to include hidden loaders.
+        :returns: A tuple of paths, each of which is a tuple. This should not be modified.
+        """
+        show_hidden = bool(show_hidden)
+        cache = self.__dict__.setdefault("_concrete_children", {})
+        cached = cache.get(show_hidden)
+        if cached is not None and cached[0] == Configurable_loader.generation:
+            return cached[1]
         
-        # Iterate through each of our immediate children.
+        paths = []
         for child_path in self.sub_node_paths:
             # If any of the items in the child path are hidden, and we've been asked to ignore hidden items, do so.
-            if not show_hidden:
-                skip = False
-                for child_path_item in child_path:
-                    if child_path_item.config.get("meta", {}).get("hidden", False):
-                        skip = True
+            if not show_hidden and any(child_path_item.hidden for child_path_item in child_path):
+                continue
                         
-                if skip:
-                    continue
-            
-            # Make a new path so we don't add to the same one for each child.
-            new_path = list(current_path)
-            
-            # Add the child path to the new_path.    
-            new_path.extend(child_path)
-            
+            child_path = tuple(child_path)
             if child_path[-1].pseudo:
-                # This child is pseudo (ie, not concrete), so we want its children.
-                
-                # Continue in the child.
-                child_path[-1].get_concrete_children(show_hidden = show_hidden, _concrete_children = concrete_children, _current_path = new_path)
+                # This child is pseudo (ie, not concrete), so we want its children (which are also cached).
+                paths.extend(child_path + path for path in child_path[-1].concrete_children(show_hidden))
                 
             else:
-                # Add the path to our total list.
-                concrete_children.append(new_path)
+                paths.append(child_path)
                 
-        return concrete_children
+        paths = tuple(paths)
+        cache[show_hidden] = (Configurable_loader.generation, paths)
+        return paths
+    
+    def iter_concrete_children(self, show_hidden = False, _current_path = ()):
+        """
+        Lazily walk the children of this loader that are concrete, see get_concrete_children().
+        
+        Nothing is cached, so this is cheaper than get_concrete_children() when only the first few children are needed.
+        
+        :param show_hidden: Whether to include hidden loaders.
+        :param _current_path: A tuple of pseudo loaders that have already been traversed up to this point, used when called recursively.
+        :returns: A generator of paths (lists) to concrete children, in the same order as get_concrete_children().
+        """
+        for child_path in self.sub_node_paths:
+            if not show_hidden and any(child_path_item.hidden for child_path_item in child_path):
+                continue
+            
+            new_path = _current_path + tuple(child_path)
+            if child_path[-1].pseudo:
+                yield from child_path[-1].iter_concrete_children(show_hidden, new_path)
+            
+            else:
+                yield list(new_path)
     
     def resolve(self, *args, **kwargs):
         raise NotImplementedError()
@@ -178,6 +511,27 @@ class Configurable_loader():
     def path_by_tags(self, *args, **kwargs):
         raise NotImplementedError()
     
+    def method_count(self):
+        """
+        The (recursive) total number of valid methods that start with one of the configurables under this loader.
+        
+        A method is a chain of configurables, one of each TYPE (for example destination, program and calculation), where each is a valid child (see Single_loader.valid_child_path()) of the last.
+        The count is cached until the links between any loaders change, so each loader is only counted once.
+        """
+        cached = self.__dict__.get("_method_count")
+        if cached is not None and cached[0] == Configurable_loader.generation:
+            return cached[1]
+        
+        count = self.calc_method_count()
+        self._method_count = (Configurable_loader.generation, count)
+        return count
+    
+    def calc_method_count(self):
+        raise NotImplementedError()
+    
+    def walk_methods(self, path, offset, parts, start = 0):
+        raise NotImplementedError()
+    
     def merge_with_parent(self, parent_config):
         """
         Merge the config options of this node with the config options of the parent node.
@@ -185,7 +539,7 @@ class Configurable_loader():
         :param parent_config: The config options from the parent node.
         """
         # First, merge our current parent object with ourself.
-        deepmerge.always_merger.merge(parent_config, copy.deepcopy(self.config))
+        merge(parent_config, copy_value(self.config))
                 
         # Add ourself to the loader path.
         try:
@@ -199,10 +553,14 @@ class Configurable_loader():
         Convert (or attempt to) a config dict to an appropriate configurable object.
         
         :raises Exception: If the class_name of the configurable is not set or cannot be found.
-        :param config: The config dict.
+        :param config: The config dict. This is consumed, it should not be used (or changed) afterwards.
         :param validate: Whether to validate the configured object.
         :returns: A loaded Configurable object.
         """
+        if isinstance(config, Layered_dict):
+            # Layers are only used while resolving, the configurable gets real dicts.
+            config = config.to_dict()
+        
         #config['meta']['TYPE'] = self.TYPE
         setopt(config, 'meta', 'TYPE', value = self.TYPE)
         # These options have no meaning anymore.
@@ -221,7 +579,8 @@ class Configurable_loader():
             # If this breaks something it will be reinstated.
             cls = self.type_class
 
-        configurable = cls(loader_list = loader_path, validate_now = validate, **config)
+        # The values in config are already our own, so don't need copying again.
+        configurable = cls(loader_list = loader_path, validate_now = validate, copy_options = False, **config)
         #configurable = cls(validate_now = validate, **config)
         
         # Calling finalize here is a bad idea; it means any changes the user makes will silently be ignored in the child object (unless finalize() is called again).
@@ -236,7 +595,7 @@ class Configurable_loader():
         """
         raise NotImplementedError()
     
-    def link(self, loaders, children):
+    def link(self, loaders, children, tag_index = None):
         """
         Link this partial loader to a number of other loaders.
         
@@ -244,6 +603,7 @@ class Configurable_loader():
         
         :param loaders: A flat list of the other loaders of the same type that have been parsed.
         :param children: The top loader (probably a configurable list) for the child type for this loader.
+        :param tag_index: An optional Tag_index of loaders, used to speed up finding loaders by tag.
         """
         pass
     
@@ -251,6 +611,118 @@ class Configurable_loader():
         """
         Find the first child loader that has a given tag.
         
+        This uses the (cached) index of the tree under this loader, see tag_index().
+        
+        :param tag: The tag to search for.
+        :returns: A list of loaders leading to the one with the given tag.
+        """
+        try:
+            path, loader_lists = self.tag_index()[1].get(tag, (None, []))
+        
+        except (TypeError, Unindexable_exception):
+            # Either the tag or our tree can't be indexed, search the slow way.
+            return self.find_by_search(tag)
+        
+        if path is not None:
+            return list(path)
+        
+        elif len(loader_lists) == 0:
+            raise Exception(self.not_found_message(tag))
+        
+        else:
+            raise Unresolvable_tag_path_error(tag, [list(loader_list) for loader_list in loader_lists])
+    
+    def not_found_message(self, tag):
+        """
+        Get the error message for when a tag can't be found.
+        """
+        if self.TAG is not None:
+            return "Could not find a definition with link:tag '{}' that is a child of '{}'".format(tag, self.TAG)
+        
+        else:
+            return "Could not find a definition with link:tag '{}'".format(tag)
+    
+    def tag_index(self, _visiting = None):
+        """
+        Get the (cached) index of tags in the tree of loaders under this loader.
+        
+        The index gives the same results as search_by_tag() (which performs an iterative deepening search), but is built in one pass and then cached until our tree changes.
+        It is a tuple of (info, found, height), where:
+          - info is a dict that maps each tag in our tree (including our own) to a tuple of (search height, paths).
+            paths are the paths from us to the loaders that search_by_tag(tag, max_depth) would return when called by our parent,
+            and search height is the smallest max_depth for which that call would not raise a Depth_exception.
+          - found is a dict that maps each tag to the result of find(tag), a tuple of (path, paths).
+            path is the unique, shortest path to a loader with that tag (or None if the shortest path isn't unique), and paths are the shortest paths.
+          - height is the length of the longest path under us.
+        
+        :raises Unindexable_exception: If our tree contains an unhashable tag or a cycle.
+        :param _visiting: The loaders currently being indexed, used when called recursively.
+        """
+        try:
+            return self._tag_index
+        
+        except AttributeError:
+            pass
+        
+        # Check for cycles (which search_by_tag() is also unable to cope with).
+        visiting = set() if _visiting is None else _visiting
+        if self in visiting:
+            raise Unindexable_exception()
+        
+        visiting.add(self)
+        try:
+            children = [child.tag_index(visiting) for child in self.NEXT]
+        
+        finally:
+            visiting.discard(self)
+        
+        # For each tag, the position, search height and paths of each child that has that tag.
+        matches = {}
+        for position, (child_info, child_found, child_height) in enumerate(children):
+            for tag, (search_height, paths) in child_info.items():
+                matches.setdefault(tag, []).append((position, search_height, paths))
+        
+        # Children that don't have a tag will be searched to their full height.
+        by_height = sorted(range(len(children)), key = lambda position: children[position][2], reverse = True)
+        
+        info = {}
+        found = {}
+        for tag, tag_matches in matches.items():
+            positions = set(position for position, search_height, paths in tag_matches)
+            other_height = next((children[position][2] for position in by_height if position not in positions), 0)
+            
+            info[tag] = (
+                1 + max(other_height, max(search_height for position, search_height, paths in tag_matches)),
+                tuple((self,) + path for position, search_height, paths in tag_matches for path in paths)
+            )
+            
+            # search_by_tag() only returns matches from the children that can be searched at the lowest depth.
+            lowest = min(search_height for position, search_height, paths in tag_matches)
+            found[tag] = [(self,) + path for position, search_height, paths in tag_matches if search_height == lowest for path in paths]
+        
+        # Our own tag takes precedence.
+        try:
+            info[self.TAG] = (0, ((self,),))
+            found[self.TAG] = [(self,)]
+        
+        except TypeError:
+            raise Unindexable_exception() from None
+        
+        # Finally, find() wants the closest match only.
+        for tag, loader_lists in found.items():
+            shortest = min(len(loader_list) for loader_list in loader_lists)
+            loader_lists = [loader_list for loader_list in loader_lists if len(loader_list) == shortest]
+            found[tag] = (loader_lists[0] if len(loader_lists) == 1 else None, loader_lists)
+        
+        height = 1 + max(child_height for child_info, child_found, child_height in children) if len(children) > 0 else 0
+        
+        self._tag_index = (info, found, height)
+        return self._tag_index
+    
+    def find_by_search(self, tag):
+        """
+        Find the first child loader that has a given tag, without using an index.
+        
         :param tag: The tag to search for.
         :returns: A list of loaders leading to the one with the given tag.
         """
@@ -259,12 +731,7 @@ class Configurable_loader():
         
         # Panic if we've got nothing.
         if len(loader_lists) == 0:
-            if self.TAG is not None:
-                message = "Could not find a definition with link:tag '{}' that is a child of '{}'".format(tag, self.TAG)
-            
-            else:
-                message = "Could not find a definition with link:tag '{}'".format(tag)
-            raise Exception(message)
+            raise Exception(self.not_found_message(tag))
         
         # We want the match that is closest to us (fewest path steps away).
         shortest = min((len(loader_path) for loader_path in loader_lists))
@@ -343,6 +810,9 @@ class Partial_loader(Configurable_loader):
     A configurable that is made up of multiple linked config objects.
     """
     
+    # An optional Resolve_cache of the configurables resolved by resolve().
+    resolve_cache = None
+    
     def __init__(self, file_name, TYPE, config, pseudo = False):
         """
         :param file_name: The file from which this loader was parsed.
@@ -363,7 +833,28 @@ class Partial_loader(Configurable_loader):
             return self._size
     
     def calc_size(self):
-        return  sum(child.size() for child in self.NEXT)
+        return self.child_offsets()[0][-1]
+    
+    def child_offsets(self):
+        """
+        Get the (cached) cumulative sizes of our children, used to convert between indexes and paths.
+        
+        :returns: A tuple of (offsets, positions). offsets[i] is the total size of the children before position i in NEXT (so the last item is our size), and positions maps each child to its first position in NEXT.
+        """
+        try:
+            return self._child_offsets
+        
+        except AttributeError:
+            pass
+        
+        offsets = [0]
+        positions = {}
+        for position, child in enumerate(self.NEXT):
+            offsets.append(offsets[-1] + child.size())
+            positions.setdefault(child, position)
+        
+        self._child_offsets = (offsets, positions)
+        return self._child_offsets
     
     def split_identifier_string(self, identifier, check_length = True):
         """
@@ -426,8 +917,216 @@ class Partial_loader(Configurable_loader):
         :param identifier: The identifier string.
         :param validate: Whether to call validate() on each of the final resolved configurables.
         """
-        parts = self.split_identifier_string(identifier, check_length = True)
-        return self.resolve_method(*parts, validate = validate)
+        # Compiling the string (splitting it, finding the path of each part and checking each is a valid child of the last) is skipped if it is cached.
+        method_cache = self.get_method_cache()
+        try:
+            if method_cache is not None:
+                compiled = method_cache.get(normalise_method_string(identifier), Configurable_loader.generation, lambda: self.compile_method_string(identifier))
+            
+            else:
+                compiled = self.compile_method_string(identifier)
+        
+        except Exception:
+            compiled = Method_cache.UNCOMPILABLE
+        
+        if compiled is Method_cache.UNCOMPILABLE:
+            # Compiling checks every part before any is resolved, so resolve each part in turn instead to raise the same error (an invalid configurable, for example, rather than an invalid child).
+            return self.resolve_method(*self.split_identifier_string(identifier, check_length = True), validate = validate)
+        
+        return tuple(top.resolve_full_path(path, validate = validate) for top, path in compiled)
+    
+    def get_method_cache(self):
+        """
+        Get the cache of compiled method strings used by resolve_method_string(), which is created when first needed.
+        
+        Set the method_cache attribute to None to disable the cache.
+        
+        :returns: A Method_cache, or None if disabled.
+        """
+        try:
+            return self.method_cache
+        
+        except AttributeError:
+            self.method_cache = Method_cache()
+            return self.method_cache
+    
+    def compile_method_string(self, identifier):
+        """
+        Compile a string which identifies a complete method into the loader paths of each of its parts.
+        
+        :param identifier: The identifier string, as for resolve_method_string().
+        :returns: A tuple of (loader, path) tuples, one for each part of the method, where each path should be resolved by the corresponding loader (see resolve_full_path()).
+        """
+        compiled = []
+        last = None
+        next_top = self
+        
+        for part in self.split_identifier_string(identifier, check_length = True):
+            path = next_top.path_by_identifier(part)
+            
+            # Check our new loader is a possible child of our last.
+            if last is not None and not last.valid_child_path(path):
+                raise Exception("configurable '{}' is not a valid child of '{}'".format(
+                    next_top.resolve_full_path(path, validate = False).description,
+                    compiled[-1][0].resolve_full_path(compiled[-1][1], validate = False).description
+                ))
+            
+            compiled.append((next_top, path))
+            next_top = path[-1].top_child
+            last = path[-1]
+        
+        return tuple(compiled)
+    
+    def resolve_many(self, identifiers, validate = True):
+        """
+        Resolve a batch of identifiers at once.
+        
+        This is equivalent to calling resolve() for each identifier, but identical identifiers are only resolved (and validated) once,
+        and an exception resolving one identifier does not stop the rest from being resolved.
+        
+        :param identifiers: A list of identifiers to resolve (see resolve()).
+        :param validate: Whether to call validate() on each of the resolved configurables.
+        :returns: A list, in the same order as identifiers, of either the resolved configurable or the exception that was raised resolving it.
+        """
+        results = self.resolve_batch([[identifier] for identifier in identifiers], validate = validate)
+        return [result if isinstance(result, Exception) else result[0] for result in results]
+    
+    def resolve_method_strings(self, identifiers, validate = True):
+        """
+        Resolve a batch of strings that each identify a complete method at once.
+        
+        This is equivalent to calling resolve_method_string() for each identifier, but identical identifiers (and identical parts of identifiers) are only resolved (and validated) once,
+        and an exception resolving one method does not stop the rest from being resolved.
+        
+        :param identifiers: A list of identifier strings.
+        :param validate: Whether to call validate() on each of the resolved configurables.
+        :returns: A list, in the same order as identifiers, of either the resolved method (a tuple of configurables) or the exception that was raised resolving it.
+        """
+        split = {}
+        methods = []
+        for identifier in identifiers:
+            try:
+                parts = split[identifier]
+            
+            except (KeyError, TypeError):
+                try:
+                    parts = self.split_identifier_string(identifier, check_length = True)
+                
+                except Exception as e:
+                    parts = e
+                
+                try:
+                    split[identifier] = parts
+                
+                except TypeError:
+                    # Not hashable (and so certainly not a valid identifier).
+                    pass
+            
+            methods.append(parts)
+        
+        return self.resolve_batch(methods, validate = validate)
+    
+    def resolve_batch(self, methods, validate = True):
+        """
+        Resolve a batch of methods, each of which is a list of identifiers that is resolved as by resolve_method().
+        
+        Each unique identifier (of each loader) is resolved only once, and the merged configs of loaders shared between paths are reused (see merged_prefix()).
+        Each unique configurable is then validated once, and copies are handed out where the same configurable is needed more than once,
+        so each result is independent of every other.
+        
+        :param methods: A list of lists of identifiers. Any item that is an exception is returned unchanged (as that item's result).
+        :param validate: Whether to call validate() on each of the resolved configurables, or "lazy" to validate each option as it is read (see Configurable.__init__()).
+        :returns: A list, in the same order as methods, of either a tuple of resolved configurables or the exception that was raised resolving it.
+        """
+        # Configurables (or the exceptions raised instead) that have already been resolved, by the loader they were resolved from and their identifier.
+        resolved = {}
+        # Lazily validated configurables validate themselves.
+        lazy = validate == "lazy"
+        results = [self.resolve_batch_method(identifiers, resolved, validate = "lazy" if lazy else False) if not isinstance(identifiers, Exception) else identifiers for identifiers in methods]
+        
+        # Validate each unique configurable, once.
+        errors = {}
+        if validate and not lazy:
+            unique = {id(part): part for result in results if not isinstance(result, Exception) for part in result}
+            for configurable in unique.values():
+                error = validation_error(configurable)
+                if error is not None:
+                    errors[id(configurable)] = error
+        
+        # Only the first user of each configurable gets the original, everyone else gets a copy.
+        used = set()
+        for position, result in enumerate(results):
+            if isinstance(result, Exception):
+                continue
+            
+            error = next((errors[id(part)] for part in result if id(part) in errors), None)
+            if error is not None:
+                results[position] = error
+                continue
+            
+            parts = []
+            for part in result:
+                if id(part) in used:
+                    part = part.copy()
+                
+                else:
+                    used.add(id(part))
+                
+                parts.append(part)
+            
+            results[position] = tuple(parts)
+        
+        return results
+    
+    def resolve_batch_method(self, identifiers, resolved, validate = False):
+        """
+        Resolve a single method of a batch, reusing configurables that have already been resolved.
+        
+        :param identifiers: A list of identifiers, as for resolve_method().
+        :param resolved: A dict of configurables (or exceptions) that have already been resolved, by (loader, identifier). New configurables are added to this dict.
+        :param validate: How to validate the resolved configurables, normally False (they are validated afterwards) or "lazy".
+        :returns: A list of resolved configurables, or the exception that was raised resolving them.
+        """
+        parts = []
+        last = None
+        next_top = self
+        
+        for identifier in identifiers:
+            # Tag lists are compared by their contents.
+            key = (next_top, tuple(identifier) if isinstance(identifier, (list, tuple)) else identifier)
+            try:
+                configurable = resolved[key]
+            
+            except (KeyError, TypeError):
+                try:
+                    configurable = next_top.resolve(identifier, validate = validate)
+                
+                except Exception as e:
+                    configurable = e
+                
+                try:
+                    resolved[key] = configurable
+                
+                except TypeError:
+                    pass
+            
+            if isinstance(configurable, Exception):
+                return configurable
+            
+            path = configurable.loader_list
+            
+            # Check our new loader is a possible child of our last.
+            if last is not None and not last.valid_child_path(path):
+                return Exception("configurable '{}' is not a valid child of '{}'".format(
+                    configurable.description,
+                    parts[-1].description
+                ))
+            
+            next_top = path[-1].top_child
+            last = path[-1]
+            parts.append(configurable)
+        
+        return parts
     
     def resolve(self, identifier, validate = True):
         """
@@ -437,10 +1136,19 @@ class Partial_loader(Configurable_loader):
         
         :raises TypeError: If identifier is not an integer, str, list or tuple.
         :param identifier: The identifier to resolve.
-        :param validate: Whether to call validate() on the final resolved configurable.
+        :param validate: Whether to call validate() on the final resolved configurable, or "lazy" to validate each of its options when first read (see Configurable.__init__()).
         :returns: A resolved configurable object and the path from which that object was resolved.
         """
-        # First, build or loader list.
+        return self.resolve_full_path(self.path_by_identifier(identifier), validate = validate)
+    
+    def path_by_identifier(self, identifier):
+        """
+        Build the loader path of one of the configurables that are represented by this loader.
+        
+        :raises TypeError: If identifier is not an integer, str, list or tuple.
+        :param identifier: A unique index (1 - inf) or a unique list of tag names, as for resolve().
+        :returns: The loader path (a list), starting with this loader.
+        """
         if is_int(identifier):
             # Identifier is an index.
             path = self.path_by_index(int(identifier))
@@ -457,9 +1165,56 @@ class Partial_loader(Configurable_loader):
             # Unrecognised identifier
             raise TypeError("identifier must be either an integer, str or a list-like/tuple-like, not '{}'".format(type(identifier)))
         
+        return path
+    
+    def resolve_full_path(self, path, validate = True):
+        """
+        Resolve a complete loader path (as built by path_by_identifier()), using our resolve_cache (if we have one).
+        
+        :param path: The loader path, starting with this loader.
+        :param validate: Whether to call validate() on the final resolved configurable.
+        :returns: A resolved configurable object.
+        """
+        if self.resolve_cache is not None:
+            # Configurables resolved from loaders whose config has since changed won't be reused.
+            key = (tuple(path), validate, tuple(loader.config_version for loader in path))
+            return self.resolve_cache.get(key, lambda: self.resolve_path(path, validate = validate))
+        
         # Now resolve our path.
         return self.resolve_path(path, validate = validate)
     
+    def __iter__(self):
+        """
+        Iteration magic method.
+        
+        Configurables are resolved in the same order as by index (resolve(1), resolve(2) etc.), but in a single walk of the tree.
+        """
+        parent_config = {}
+        self.merge_with_parent(parent_config)
+        yield from self.resolve_children(parent_config, validate = False)
+    
+    def resolve_children(self, parent_config, validate = True):
+        """
+        Resolve each of the configurables under this loader in turn.
+        
+        The tree is walked depth first, so the config options of each loader are only merged once.
+        
+        :param parent_config: The merged config options of this loader (and its parents). This dict will be modified.
+        :param validate: Whether to call validate() on each of the resolved configurables.
+        :returns: A generator of resolved configurables.
+        """
+        children = [child for child in self.NEXT if child.size() > 0]
+        for position, child in enumerate(children):
+            # Each child needs its own copy of our config, except the last which can have the original.
+            child_config = copy_config(parent_config) if position < len(children) -1 else parent_config
+            
+            if child.partial:
+                child.merge_with_parent(child_config)
+                yield from child.resolve_children(child_config, validate = validate)
+            
+            else:
+                yield child.resolve_path([child], parent_config = child_config, validate = validate)
+    
     def resolve_path(self, path, parent_config = None, validate = True):
         """
         Resolve a loader path, returning a single combined configurable object.
@@ -468,6 +1223,13 @@ class Partial_loader(Configurable_loader):
         :param parent_config: The currently constructed dictionary of resolved options.
         :param validate: Whether to call validate() on the final resolved configurable.
         """
+        if parent_config is None and len(path) > 1 and all(loader.partial for loader in path[:-1]):
+            # Start from a layer on top of the (cached) merged config of the partial loaders in our path.
+            merged = self.merged_prefix((self,) + tuple(path[1:-1]))
+            parent_config = Layered_dict(merged)
+            parent_config['loader_path'] = list(merged['loader_path'])
+            return path[-1].resolve_path(path[-1:], parent_config = parent_config, validate = validate)
+        
         if parent_config is None:
             parent_config = {}
         
@@ -482,6 +1244,27 @@ class Partial_loader(Configurable_loader):
             # We ran out of parts of our path before reaching a single loader, give up.
             raise Short_tag_path_error([configurable.TAG for configurable in path])
         
+    def merged_prefix(self, prefix):
+        """
+        Get the merged config options of a path of partial loaders, starting from this loader.
+        
+        Merged configs are cached (until the config of one of the loaders in the path changes), because many paths share the same few prefixes.
+        The returned dict must not be modified; use copy_config() to get a copy that can be.
+        
+        :param prefix: A tuple of partial loaders, the first of which should be us.
+        :returns: The merged config options, the same as built by calling merge_with_parent() with each loader in turn.
+        """
+        versions = tuple(loader.config_version for loader in prefix)
+        cached = self.__dict__.setdefault("_merged_prefixes", {}).get(prefix)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        
+        merged = copy_config(self.merged_prefix(prefix[:-1])) if len(prefix) > 1 else {}
+        prefix[-1].merge_with_parent(merged)
+        
+        self._merged_prefixes[prefix] = (versions, merged)
+        return merged
+    
     def index_of_path(self, path, *, parent_offset = 0):
         """
         Get the index of the configurable identified by a unique path.
@@ -492,16 +1275,21 @@ class Partial_loader(Configurable_loader):
         :param parent_offset: The current index total from previous iterations, used when called recursively. This should not normally be given by the user.
         :returns: The index.
         """
+        offsets, positions = self.child_offsets()
+        
         # First, we need the index of the next path segment from our list of NEXT children.
         try:
-            index = self.NEXT.index(path[1])
+            index = positions[path[1]]
         
         except IndexError:
             # Ran out of path segments (or couldn't find the given segment?)
             raise Short_tag_path_error([configurable.TAG for configurable in path])
             
+        except KeyError:
+            raise ValueError("{!r} is not in list".format(path[1])) from None
+        
         # Next, we need the total of all the indexes we skipped (that are before our given index.
-        skipped_total = sum([loader.size() for loader in self.NEXT[:index]])
+        skipped_total = offsets[index]
         
         # Add this to our total parent offset from previous iterations.
         parent_offset += skipped_total
@@ -528,18 +1316,18 @@ class Partial_loader(Configurable_loader):
         path.append(self)
                 
         # We need to decide which child object from NEXT to continue to based on the range of possible indexes of each child.
-        child_offset = 0
-        for child in self.NEXT:
-            child_size = child.size()
-            if (index -1) < parent_offset + child_offset + child_size:
-                # The config we want is in this child.
-                return child.path_by_index(index, parent_offset = parent_offset + child_offset, path = path)
-            
-            # Add this child's size to the offset.
-            child_offset += child_size
-            
-        # If we get this far, index is out of range.
-        raise IndexError("Configurable index '{}' is out of range".format(index))
+        offsets = self.child_offsets()[0]
+        # Indexes start at 1.
+        relative_index = index -1 - parent_offset
+        if relative_index < 0 or relative_index >= offsets[-1]:
+            # Index is out of range.
+            raise IndexError("Configurable index '{}' is out of range".format(index))
+        
+        # The last child that starts at or before our index (which skips empty children).
+        position = bisect_right(offsets, relative_index) -1
+        
+        # The config we want is in this child.
+        return self.NEXT[position].path_by_index(index, parent_offset = parent_offset + offsets[position], path = path)
     
     def path_by_tags(self, tag_list, *, path = None, allow_incomplete = True):
         """
@@ -585,7 +1373,45 @@ class Partial_loader(Configurable_loader):
             raise Short_tag_path_error(tag_list) from None
         
 
-    def link(self, loaders, children = None):
+    def calc_method_count(self):
+        return sum(child.method_count() for child in self.NEXT)
+    
+    def iter_methods(self, start = 0):
+        """
+        Enumerate every valid method under this loader (see method_count()), without resolving any configurables.
+        
+        Only loader paths are walked (following the CHILDREN of single loaders to the next TYPE), so methods are generated lazily and cheaply,
+        in order of the index of their first part, then their second part and so on.
+        
+        :param start: The number of methods to skip. Whole subtrees are skipped at a time (using method_count()), so later pages of methods can be fetched without walking those before them.
+        :returns: A generator of (indices, tag_paths) tuples, where indices is a tuple of the index of each part of the method (as can be given to resolve_method()),
+            and tag_paths is a tuple of the tags of the loaders that lead to each part.
+        """
+        for parts in self.walk_methods([self], 0, (), max(start, 0)):
+            yield tuple(index for index, path in parts), tuple(tuple(loader.TAG for loader in path[1:]) for index, path in parts)
+    
+    def walk_methods(self, path, offset, parts, start = 0):
+        """
+        Walk the valid methods that start with one of the configurables under this loader.
+        
+        :param path: The loader path to this loader (from the top loader of our TYPE).
+        :param offset: The total size of the loaders before this one, see path_offsets().
+        :param parts: The (index, path) of each of the parts of the method before this one.
+        :param start: The number of methods to skip.
+        :returns: A generator of methods, each a tuple of (index, path) for each part.
+        """
+        offsets = self.child_offsets()[0]
+        for position, child in enumerate(self.NEXT):
+            if start > 0:
+                count = child.method_count()
+                if start >= count:
+                    start -= count
+                    continue
+            
+            yield from child.walk_methods(path + [child], offset + offsets[position], parts, start)
+            start = 0
+    
+    def link(self, loaders, children = None, tag_index = None):
         """
         Link this loader to a number of other loaders.
         
@@ -593,12 +1419,13 @@ class Partial_loader(Configurable_loader):
         
         :param loaders: A flat list of the other loaders of the same type that have been parsed.
         :param children: The top loader (probably a configurable list) for the child type for this loader.
+        :param tag_index: An optional Tag_index of loaders, used to speed up finding loaders by tag.
         """
         try:
             for tag in self.config['link']['next']:
                 # Look for a loader with this tag and add.
                 # TODO: Should watch out for infinite recursion here.
-                matching = [loader for loader in loaders if loader.TAG == tag]
+                matching = tag_index.find(tag) if tag_index is not None else [loader for loader in loaders if loader.TAG == tag]
                 
                 # Panic if we couldn't find any.
                 if len(matching) == 0:
@@ -642,7 +1469,7 @@ class Configurable_list(Partial_loader):
         self.NEXT = configs
         
         # A flat version of all our child loaders.
-        self.loaders = configs
+        self.loaders = self.NEXT
 
 
 class Single_loader(Configurable_loader):
@@ -652,6 +1479,23 @@ class Single_loader(Configurable_loader):
     
     partial = False
     
+    cache_attrs = Configurable_loader.cache_attrs + ("_child_trie", "_child_subtrees")
+    
+    # Marks the end of a path in a child_trie().
+    TRIE_END = None
+    
+    @property
+    def CHILDREN(self):
+        """
+        A list of paths (lists of loaders) to loaders that are children of this loader.
+        """
+        return self._CHILDREN
+    
+    @CHILDREN.setter
+    def CHILDREN(self, value):
+        self._CHILDREN = Child_path_list(value, owner = self)
+        self.__dict__.pop("_child_trie", None)
+    
     def __init__(self, file_name, TYPE, config):
         """
         Constructor for Single_loader objects.
@@ -672,11 +1516,118 @@ class Single_loader(Configurable_loader):
         :param possible_child_path: A loader path (a list) that might be a child of this single loader.
         :returns: True or False.
         """
-        for child_path in self.CHILDREN:
-            if possible_child_path[:len(child_path)] == child_path:
+        # A possible path is valid if any of our child paths is a prefix of it.
+        node = self.child_trie()
+        for loader in possible_child_path:
+            if self.TRIE_END in node:
                 return True
         
-        return False
+            try:
+                node = node[loader]
+            
+            except KeyError:
+                return False
+        
+        return self.TRIE_END in node
+    
+    def child_trie(self):
+        """
+        Get an index of our child paths, so paths can be checked without comparing against each in turn.
+        
+        The index is a prefix trie of nested dicts, keyed by loader, in which the end of each child path is marked by the TRIE_END key.
+        It is built when first needed and cached until CHILDREN changes.
+        
+        :returns: The root of the trie.
+        """
+        try:
+            return self._child_trie
+        
+        except AttributeError:
+            pass
+        
+        trie = {}
+        for child_path in self.CHILDREN:
+            node = trie
+            for loader in child_path:
+                node = node.setdefault(loader, {})
+            
+            node[self.TRIE_END] = True
+        
+        self._child_trie = trie
+        return trie
+    
+    def child_prefixes(self):
+        """
+        Get the paths in CHILDREN that don't extend any other (so the loaders under each are distinct).
+        
+        :returns: A list of child paths, in the same order as CHILDREN.
+        """
+        trie = self.child_trie()
+        prefixes = []
+        seen = set()
+        for child_path in self.CHILDREN:
+            node = trie
+            for loader in child_path:
+                if self.TRIE_END in node:
+                    # A shorter path already includes this one.
+                    break
+                
+                node = node[loader]
+            
+            else:
+                key = tuple(child_path)
+                if key not in seen:
+                    seen.add(key)
+                    # An empty path includes every loader of the child TYPE.
+                    prefixes.append(child_path if len(child_path) > 0 else [self.top_child])
+        
+        return prefixes
+    
+    def child_subtrees(self):
+        """
+        Get the distinct subtrees (of our top_child) that contain our valid children.
+        
+        :returns: A list of (offset, path) tuples (see path_offsets()), in order of offset (and so also of the indices of the loaders in each).
+        """
+        cached = self.__dict__.get("_child_subtrees")
+        if cached is not None and cached[0] == Configurable_loader.generation:
+            return cached[1]
+        
+        subtrees = sorted(((offset, prefix) for prefix in self.child_prefixes() for offset in path_offsets(prefix)), key = lambda subtree: subtree[0])
+        self._child_subtrees = (Configurable_loader.generation, subtrees)
+        return subtrees
+    
+    def calc_method_count(self):
+        if self.top_child is None:
+            # The last part of a method.
+            return 1
+        
+        return sum(prefix[-1].method_count() for offset, prefix in self.child_subtrees())
+    
+    def walk_methods(self, path, offset, parts, start = 0):
+        """
+        Walk the valid methods that start with this loader.
+        
+        :param path: The loader path to this loader (from the top loader of our TYPE).
+        :param offset: The total size of the loaders before this one, see path_offsets().
+        :param parts: The (index, path) of each of the parts of the method before this one.
+        :param start: The number of methods to skip.
+        :returns: A generator of methods, each a tuple of (index, path) for each part.
+        """
+        parts = parts + ((offset + 1, path),)
+        if self.top_child is None:
+            yield parts
+            return
+        
+        for prefix_offset, prefix in self.child_subtrees():
+            if start > 0:
+                count = prefix[-1].method_count()
+                if start >= count:
+                    start -= count
+                    continue
+            
+            yield from prefix[-1].walk_methods(list(prefix), prefix_offset, parts, start)
+            start = 0
         
     def size(self):
         """
@@ -766,12 +1717,13 @@ class Single_loader(Configurable_loader):
         
         return path
     
-    def link(self, loaders, children = None):
+    def link(self, loaders, children = None, tag_index = None):
         """
         Link this loader to a number of other loaders.
         
         :param loaders: A flat list of the other loaders of the same type that have been parsed.
         :param children: The top loader (probably a configurable list) for the child type for this loader.
+        :param tag_index: Unused by single loaders.
         """
         # TODO: We need to check that our children are actually of a valid type for us, eg disallow Gaussian calcs to be children of Turbomole programs.
         if children is not None:
@@ -814,13 +1766,17 @@ class Update_loader(Single_loader):
         raise NotImplementedError("path_by_tags() has no meaning for Update_loader objects")    
     
     
-    def update(self, loaders):
+    def update(self, loaders, tag_index = None):
         """
         Update a number of other loaders with this loader.
+        
+        :param loaders: A flat list of the loaders that could be updated.
+        :param tag_index: An optional Tag_index of loaders, used to speed up finding loaders by tag.
         """
         # Find matching.
         try:
-            matching = [loader for loader in loaders if loader.TAG == self.config['link']['tag']]
+            tag = self.config['link']['tag']
+            matching = tag_index.find(tag) if tag_index is not None else [loader for loader in loaders if loader.TAG == tag]
             
             if len(matching) == 0:
                 # No matching, panic.
@@ -828,7 +1784,8 @@ class Update_loader(Single_loader):
             
             for match in matching:
                 # Merge.
-                deepmerge.always_merger.merge(match.config, self.config)
+                merge(match.config, self.config)
+                match.config_changed()
             
         except KeyError:
             if not hasopt(self.config, "link", "tag"):
@@ -0,0 +1,73 @@
+"""
+Merging of (nested) config dicts.
+
+merge() has the same semantics as deepmerge.always_merger.merge(), but is specialised for the dicts, lists and scalars that make up config options,
+which makes it several times faster.
+"""
+
+from configurables.misc import IMMUTABLE_TYPES
+
+
+def merge_values(base, nxt):
+    """
+    Merge two values, where at least one is not a dict.
+    
+    Lists are appended and sets are joined, anything else is replaced by nxt.
+    
+    :returns: The merged value.
+    """
+    if isinstance(base, list) and isinstance(nxt, list):
+        return base + nxt
+    
+    elif isinstance(base, set) and isinstance(nxt, set):
+        return base | nxt
+    
+    else:
+        return nxt
+
+
+def merge(base, nxt):
+    """
+    Merge one (possibly nested) dict into another.
+    
+    The semantics are exactly those of deepmerge.always_merger.merge():
+      - Dicts are merged recursively (in place), values in nxt that are not in base are added to base (without copying).
+      - Lists are appended (as new lists) and sets are joined.
+      - Any other value in nxt replaces that in base (including when the types of the two values differ).
+    
+    The merge is iterative, so there is no limit to how deeply nested the dicts can be.
+    
+    :param base: The dict to merge into. This will be modified.
+    :param nxt: The dict to merge from.
+    :returns: The merged value, which is base if both base and nxt are dicts.
+    """
+    if not (isinstance(base, dict) and isinstance(nxt, dict)):
+        return merge_values(base, nxt)
+    
+    # A stack of the (base, items of nxt) still to be merged.
+    # Each level is finished before continuing with its parent, which is the same order as a recursive merge.
+    stack = [(base, iter(nxt.items()))]
+    while len(stack) > 0:
+        base_dict, nxt_items = stack[-1]
+        
+        for key, value in nxt_items:
+            if type(value) in IMMUTABLE_TYPES or key not in base_dict:
+                # Scalars always replace the existing value.
+                base_dict[key] = value
+                continue
+            
+            current = base_dict[key]
+            
+            if isinstance(current, dict) and isinstance(value, dict):
+                # Continue one level down (and come back to the rest of this level afterwards).
+                base_dict[key] = current
+                stack.append((current, iter(value.items())))
+                break
+            
+            base_dict[key] = merge_values(current, value)
+        
+        else:
+            # This level is finished.
+            stack.pop()
+    
+    return base
@@ -1,3 +1,6 @@
+import copy
+
+
 def to_bool(booly):
     """
     Convert something that might be a bool into a bool.
@@ -66,4 +69,28 @@ def is_iter(value):
         iter(value)
         return True
     except TypeError:
-        return False
\ No newline at end of file
+        return False
+
+
+# Types that copy_value() doesn't need to copy.
+IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+
+def copy_value(value):
+    """
+    Deep copy a value from a config dict.
+    
+    This is much faster than copy.deepcopy() for the dicts, lists and scalars that make up most configs (other types are copied with copy.deepcopy()).
+    """
+    value_type = type(value)
+    if value_type in IMMUTABLE_TYPES:
+        return value
+    
+    elif value_type is dict:
+        return {key: copy_value(item) for key, item in value.items()}
+    
+    elif value_type is list:
+        return [copy_value(item) for item in value]
+    
+    else:
+        return copy.deepcopy(value)
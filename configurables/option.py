@@ -1,5 +1,4 @@
 import itertools
-import yaml
 import textwrap
 import math
 import collections
@@ -9,7 +8,8 @@ import re
 from configurables.exception import Configurable_option_exception,\
     Missing_option_exception, Disallowed_choice_exception
 from configurables.defres import Default, defres
-from configurables.misc import is_number
+from configurables.misc import is_number, copy_value
+from configurables import yaml_io
 
 
 class InheritedAttrError(AttributeError):
@@ -28,7 +28,7 @@ class Nested_dict_type(collections.UserDict):
             data = text.value
             
         else:
-            data = yaml.safe_load(text)
+            data = yaml_io.safe_load(text)
             if data is None:
                 data = {}
                 
@@ -41,11 +41,15 @@ class Nested_dict_type(collections.UserDict):
     def value(self):
         return self.data
     
+    def __deepcopy__(self, memo):
+        # Our data is almost always simple yaml types, which copy_value() copies much faster than deepcopy().
+        return type(self)(copy_value(self.data))
+    
     def __str__(self):
         if len(self.data) == 0:
             return ""
         else:
-            return yaml.safe_dump(self.data)
+            return yaml_io.safe_dump(self.data)
         
 class Duration():
     """
@@ -118,6 +122,9 @@ class Option():
     Options are descriptors that perform type checking and other functionality for Configurables; they expose the options that a certain configurable expects.
     """
     
+    # Types of choices (and values) that can be found in an index of choices, because their hashing is consistent with their equality.
+    INDEXABLE_CHOICE_TYPES = frozenset((str, int, float, bool, type(None)))
+    
     def __init__(self, name = None, *, default = Default(None), help = Default(None), choices = Default(None), validate = Default(None), list_type = Default(None), type = Default(None), type_func = Default(None), exclude = Default(None), required = Default(False), no_none = Default(None), none_to_default = Default(False), no_edit = Default(False), dump_func = Default(None), edit_vtype = Default(None), data_func = Default(None)):
         """
         Constructor for Configurable Option objects.
@@ -174,7 +181,7 @@ class Option():
         self.list_type = defres(list_type)
         #self.type = type
         self.help = defres(help)
-        self.choices = defres(choices) if defres(choices) is not None else []
+        self.choices = defres(choices) if defres(choices) is not None else ()
         self._validate = defres(validate) if defres(validate) is not None else self.default_validate
         self.exclude = defres(exclude) if defres(exclude) is not None else []
         if isinstance(self.exclude, str):
@@ -223,6 +230,51 @@ class Option():
         # By definition, Options that are required can have no default, so we'll delete this attribute.
         if self.required:
             del(self._default)
+    
+    @property
+    def choices(self):
+        """
+        A tuple of valid choices for this option, or an empty tuple if any value is allowed.
+        
+        Choices are indexed (see choice_index()) when they are set, so to change them set a new iterable of choices.
+        """
+        return self._choices
+    
+    @choices.setter
+    def choices(self, value):
+        self._choices = tuple(value)
+        self._choice_index = self.index_choices(self._choices)
+    
+    def choice_index(self):
+        """
+        Get the index of our choices, which validate_choices() uses to find a match without comparing against each choice in turn.
+        
+        :returns: A tuple of (exact, lowered), where exact maps each choice to its first position in choices,
+            and lowered maps each lower-cased str choice to a tuple of its first position and the choice itself.
+            exact and lowered are None if our choices cannot be indexed.
+        """
+        return self._choice_index
+    
+    @classmethod
+    def index_choices(self, choices):
+        """
+        Build an index of some choices (see choice_index()).
+        
+        :param choices: A tuple of choices.
+        :returns: A tuple of (exact, lowered).
+        """
+        exact = {}
+        lowered = {}
+        for position, choice in enumerate(choices):
+            if type(choice) not in self.INDEXABLE_CHOICE_TYPES:
+                # Choices with their own idea of equality must be compared one at a time.
+                return (None, None)
+            
+            exact.setdefault(choice, position)
+            if type(choice) is str:
+                lowered.setdefault(choice.lower(), (position, choice))
+        
+        return (exact, lowered)
 
     def __set_name__(self, owning_cls, name):
         """
@@ -358,6 +410,14 @@ class Option():
         if owning_obj is None:
             return self
         
+        # Frozen configurables have already computed the values of their options.
+        frozen = owning_obj.__dict__.get("_frozen_values")
+        if frozen is not None:
+            return frozen[self.name]
+        
+        if getattr(owning_obj, "_lazy_validated", None) is not None:
+            owning_obj._option_read(self, owning_obj._configurable_options)
+        
         return self.get_from_dict(owning_obj, owning_obj._configurable_options)
     
     def dump(self, owning_obj, dict_obj, explicit = False):
@@ -430,7 +490,7 @@ class Option():
         
         for property_desc, property_name in (("default", "_default"), ("choices", "choices"), ("excludes", "exclude"), ("required", "required")):
             property_value = getattr(self, property_name, None)
-            if property_value != None and (not isinstance(property_value, list) or len(property_value) > 0):
+            if property_value != None and (not isinstance(property_value, (list, tuple)) or len(property_value) > 0):
                 property_strings.append("{}: {}".format(property_desc, property_value))
         
         if len(property_strings) > 0:
@@ -455,7 +515,7 @@ class Option():
                 if default.__class__.__module__ not in ('__builtin__', 'builtins'):
                     default = str(default)
                 
-                value = yaml.safe_dump({self.name: default})
+                value = yaml_io.safe_dump({self.name: default})
                 indent_level = 1
             
             else:
@@ -468,7 +528,7 @@ class Option():
             # NOTE: If this option is expected but not set, this will fail.
             # We could handle this if we wanted...
             #value = "{}: {}".format(self.name, self.dump(owning_cls_or_obj, dict_obj))
-            value = yaml.safe_dump({self.name: self.dump(owning_cls_or_obj, dict_obj)})
+            value = yaml_io.safe_dump({self.name: self.dump(owning_cls_or_obj, dict_obj)})
             # If this is a real value, don't comment.
             indent_level = 2 if not self.is_default(owning_cls_or_obj, dict_obj) else 1
             
@@ -546,6 +606,15 @@ class Option():
 
         return val
 
+    def effective_value(self, owning_obj, dict_obj):
+        """
+        Get the effective value of this option (the explicit value if set, otherwise the default) as plain data.
+        
+        :param owning_obj: The owning object on which this Option object is set as a class attribute.
+        :param dict_obj: The dict in which the value of this Option is stored. In most cases, the value of this option is evaluated simply as dict_obj[self.name]
+        """
+        return self.get_from_dict(owning_obj, dict_obj)
+    
 
     def __set__(self, owning_obj, value):
         """
@@ -554,6 +623,7 @@ class Option():
         :param owning_obj: The owning object on which this Option object is set as a class attribute.
         :param value: The new value to set.
         """
+        owning_obj._option_write(self)
         self.set_into_dict(owning_obj, owning_obj._configurable_options, value)
 
 
@@ -574,6 +644,7 @@ class Option():
         
         :param owning_obj: The owning object on which this Option object is set as a class attribute.
         """
+        owning_obj._option_write(self)
         self.set_default(owning_obj, owning_obj._configurable_options)
 
 
@@ -729,6 +800,21 @@ class Option():
         :param owning_obj: The owning object on which this Option object is set as a class attribute.
         :param dict_obj: The dict in which the value of this Option is stored. In most cases, the value of this option is evaluated simply as dict_obj[self.name]
         """
+        exact, lowered = self.choice_index()
+        if exact is not None and type(value) in self.INDEXABLE_CHOICE_TYPES:
+            # The first matching choice wins, whether it matches exactly or only when ignoring case.
+            exact_position = exact.get(value)
+            lowered_position, lowered_choice = lowered.get(value.lower(), (None, None)) if type(value) is str else (None, None)
+            
+            if exact_position is not None and (lowered_position is None or exact_position <= lowered_position):
+                return value
+            
+            elif lowered_position is not None:
+                # Found a match, but with different cAsInG, convert to the correct case.
+                return lowered_choice
+            
+            raise Disallowed_choice_exception(owning_obj, self, value)
+        
         for choice in self.choices:
             if value == choice:
                 # Found a match, all ok.
@@ -1,10 +1,10 @@
 from collections.abc import MutableMapping
-import deepmerge
+import weakref
 import copy
 
 from configurables.option import Option, InheritedAttrError
 from configurables.exception import Configurable_option_exception,\
-    Configurable_exception
+    Configurable_exception, Read_only_exception
 from configurables.defres import Default
 
 # Speed hack for get_cls_options()
@@ -92,6 +92,25 @@ class Options_mixin():
             #if value is None:
             #    del(dict_obj[key])
     
+    def check_exclusion(self, owning_obj, dict_obj, options, option, exclusion):
+        """
+        Check that an option and one of the options it excludes are not both set.
+        
+        :param owning_obj: The owning object which contains these Options.
+        :param dict_obj: The dict in which the values of the child Options are stored.
+        :param options: Our child Options (see get_options()).
+        :param option: The option to check.
+        :param exclusion: The name of the option that option excludes.
+        """
+        # This option has an exclusion, check at least one of it and the exclusion is not set.
+        try:
+            if not options[exclusion].is_default(owning_obj, dict_obj) and not option.is_default(owning_obj, dict_obj):
+                raise Configurable_exception(owning_obj, "options '{}' and '{}' cannot be set at the same time (mutually exclusive)".format(option.name, exclusion))
+        
+        except KeyError:
+            # One of the given options cannot be found.
+            raise Configurable_option_exception(owning_obj, option, "The option '{}' in exclude cannot be found".format(exclusion)) from None
+    
     def validate_children(self, owning_obj, dict_obj):
         """
         Validate the child Options of this object.
@@ -117,14 +136,7 @@ class Options_mixin():
             # Also check for exclusions.
             # TODO: Extend exclusions so they can support nested options.
             for exclusion in option.exclude:
-                # This option has an exclusion, check at least one of it and the exclusion is not set.
-                try:
-                    if not options[exclusion].is_default(owning_obj, dict_obj) and not option.is_default(owning_obj, dict_obj):
-                        raise Configurable_exception(owning_obj, "options '{}' and '{}' cannot be set at the same time (mutually exclusive)".format(option.name, exclusion))
-                
-                except KeyError:
-                    # One of the given options cannot be found.
-                    raise Configurable_option_exception(owning_obj, option, "The option '{}' in exclude cannot be found".format(exclusion)) from None
+                self.check_exclusion(owning_obj, dict_obj, options, option, exclusion)
             
         # We also need to make sure there are no unexpected options.
         for unexpected_key in set(dict_obj).difference(options):
@@ -138,6 +150,83 @@ class Options_mixin():
                     raise Configurable_option_exception(owning_obj, self, msg)
 
 
+class Options_mapping_cache(dict):
+    """
+    The Options_mapping objects of a configurable, keyed by the id of the Options object they map (see Options.get_from_dict()).
+    
+    The cache is never copied or pickled with its configurable (an empty cache is used instead), because the mappings it contains are bound to the original.
+    """
+    
+    def __init__(self, owning_obj = None):
+        """
+        Constructor for Options_mapping_cache objects.
+        
+        :param owning_obj: The configurable whose mappings are cached. Caches that don't belong to the configurable they are found on (because it is a shallow copy, for example) are replaced.
+        """
+        super().__init__()
+        self.owning_obj = owning_obj
+    
+    def __deepcopy__(self, memo):
+        return type(self)()
+    
+    def __reduce__(self):
+        return (type(self), ())
+
+
+class Frozen_mixin():
+    """
+    Mixin class for the read-only containers of the values of a frozen configurable, see Configurable.freeze().
+    
+    Reads are those of the normal container, while any attempt to change it raises a Read_only_exception.
+    """
+    
+    def __init__(self, values, owning_obj, path = ()):
+        """
+        :param values: The (effective) values to contain.
+        :param owning_obj: The frozen configurable.
+        :param path: The path (a tuple of option names) of the option whose value this is, or an empty tuple for the configurable itself.
+        """
+        super().__init__(values)
+        self.owning_obj = owning_obj
+        self.path = path
+    
+    def _read_only(self, *args, **kwargs):
+        raise Read_only_exception(self.owning_obj, self.owning_obj.get_option_chain(self.path)[-1] if len(self.path) > 0 else None)
+
+
+class Frozen_mapping(Frozen_mixin, dict):
+    """
+    A read-only dict of the effective values of a frozen configurable (or of one of its Options), or of a dict option.
+    """
+    
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = Frozen_mixin._read_only
+    
+    def __reduce__(self):
+        return (type(self), (dict(self), self.owning_obj, self.path))
+
+
+class Frozen_list(Frozen_mixin, list):
+    """
+    A read-only list of the effective value of a list option of a frozen configurable, which compares equal to the same list.
+    """
+    
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = append = clear = extend = insert = pop = remove = reverse = sort = Frozen_mixin._read_only
+    
+    def __reduce__(self):
+        return (type(self), (list(self), self.owning_obj, self.path))
+
+
+class Frozen_set(Frozen_mixin, set):
+    """
+    A read-only set of the effective value of a set option of a frozen configurable, which compares equal to the same set.
+    """
+    
+    __ior__ = __iand__ = __isub__ = __ixor__ = add = clear = discard = pop = remove = update = difference_update = intersection_update = symmetric_difference_update = Frozen_mixin._read_only
+    
+    def __reduce__(self):
+        return (type(self), (set(self), self.owning_obj, self.path))
+
+
 class Options_mapping(MutableMapping):
     """
     A class that 'binds' an Options object with a parent Configurable.
@@ -154,6 +243,8 @@ class Options_mapping(MutableMapping):
         self.options_obj = options_obj
         self.owning_obj = owner_obj
         self.dict_obj = dict_obj
+        # The child options of options_obj.
+        self.options = options_obj.get_options(type(owner_obj))
 
 
     @property
@@ -184,7 +275,7 @@ class Options_mapping(MutableMapping):
         Retrieve a sub option of the Options object we are mapping.
         """
         try:
-            return self.options_obj.get_options(type(self.owning_obj))[name]
+            return self.options[name]
         
         except KeyError:                
             # Give up and panic.
@@ -194,13 +285,13 @@ class Options_mapping(MutableMapping):
         """
         The number of options in the Options object we are mapping.
         """
-        return len(self.options_obj.get_options(type(self.owning_obj)))
+        return len(self.options)
     
     def __iter__(self):
         """
         Iteration magic method.
         """
-        yield from self.options_obj.get_options(type(self.owning_obj))
+        yield from self.options
 
     def __getitem__(self, key):
         """
@@ -210,7 +301,12 @@ class Options_mapping(MutableMapping):
         
         :param key: The name of an Option contained within the Options object that we are mapping.
         """
-        return self.get_sub_option(key).get_from_dict(self.owning_obj, self.sub_dict_obj)
+        option = self.get_sub_option(key)
+        if getattr(self.owning_obj, "_lazy_validated", None) is not None and not isinstance(option, Options):
+            # Validate against the same dict as validate() would, which is a throwaway dict if ours doesn't exist yet (so defaults aren't stored).
+            self.owning_obj._option_read(option, self.dict_obj.get(self.options_obj.name, {}))
+        
+        return option.get_from_dict(self.owning_obj, self.sub_dict_obj)
 
 
     def __setitem__(self, key, value):
@@ -220,7 +316,9 @@ class Options_mapping(MutableMapping):
         :param key: The name of the Option to set.
         :param value: The value of the Option to set.
         """
-        self.get_sub_option(key).set_into_dict(self.owning_obj, self.sub_dict_obj, value)
+        option = self.get_sub_option(key)
+        self.owning_obj._option_write(option)
+        option.set_into_dict(self.owning_obj, self.sub_dict_obj, value)
 
 
     def __delitem__(self, key):
@@ -229,7 +327,9 @@ class Options_mapping(MutableMapping):
         
         :param key: The key to delete.
         """
-        self.get_sub_option(key).set_default(self.owning_obj, self.sub_dict_obj)
+        option = self.get_sub_option(key)
+        self.owning_obj._option_write(option)
+        option.set_default(self.owning_obj, self.sub_dict_obj)
         
     def __deepcopy__(self, memo):
         """
@@ -302,6 +402,10 @@ class Options(Option, Options_mixin):
             # Set ourselves as parent.
             kwargs[argname].add_parent(self)
     
+        # Speed hack for get_options(), resolved child options keyed by owning class.
+        # Weak keys mean classes created on the fly (by classify() for example) get their own entry, and don't hang around once they're gone.
+        self._options_cache = weakref.WeakKeyDictionary()
+    
     
     def __set_name__(self, owning_cls, name):
         """
@@ -349,7 +453,10 @@ class Options(Option, Options_mixin):
             parent_options = {}
             
         # Merge the returned options with our own.
-        return deepmerge.always_merger.merge(parent_options, self._options)
+        # Our children are Option objects (never dicts or lists), so this is equivalent to a deep merge (but doesn't modify parent_options, which may be cached).
+        options = dict(parent_options)
+        options.update(self._options)
+        return options
     
     
     def get_options(self, owning_cls):
@@ -357,8 +464,17 @@ class Options(Option, Options_mixin):
         Get a dict of all the configurable options of this object.
         
         The key of each item is the name of the corresponding option.
+        
+        IMPORTANT: Result caching is in use here for speed improvements.
+        The options for each owning class are only resolved once, and the returned dict is shared, so it should not be modified.
         """
-        return self.get_inherited_options(owning_cls)
+        try:
+            return self._options_cache[owning_cls]
+        
+        except KeyError:
+            options = self.get_inherited_options(owning_cls)
+            self._options_cache[owning_cls] = options
+            return options
     
     def describe(self, owning_cls_or_obj):
         """
@@ -382,6 +498,10 @@ class Options(Option, Options_mixin):
         if owning_obj is None:
             return self
         
+        frozen = owning_obj.__dict__.get("_frozen_values")
+        if frozen is not None:
+            return frozen[self.name]
+        
         return self.get_from_dict(owning_obj, owning_obj._configurable_options)
 
 
@@ -392,7 +512,28 @@ class Options(Option, Options_mixin):
         :param owning_obj: The owning object on which this Option object is set as a class attribute.
         :param dict_obj: The dict in which the value of this Option is stored. In most cases, the value of this option is evaluated simply as dict_obj[self.name]
         """
-        return Options_mapping(self, owning_obj, dict_obj)
+        # Mappings are reused for as long as dict_obj stays the same, which saves creating a new one for each level of every read.
+        cache = owning_obj.__dict__.get("_options_mappings")
+        if cache is None or cache.owning_obj is not owning_obj:
+            # Shallow copies share the __dict__ (and so the cache) of the original, but need mappings of their own.
+            cache = Options_mapping_cache(owning_obj)
+            owning_obj.__dict__["_options_mappings"] = cache
+        
+        mapping = cache.get(id(self))
+        if mapping is None or mapping.dict_obj is not dict_obj:
+            mapping = Options_mapping(self, owning_obj, dict_obj)
+            cache[id(self)] = mapping
+        
+        return mapping
+    
+    def effective_value(self, owning_obj, dict_obj):
+        """
+        Get the effective values of our sub options (including defaults) as a nested dict.
+        
+        :param owning_obj: The owning object on which this Option object is set as a class attribute.
+        :param dict_obj: The dict in which the value of this Option is stored. In most cases, the value of this option is evaluated simply as dict_obj[self.name]
+        """
+        return {option.name: option.effective_value(owning_obj, self.get_sub_dict(dict_obj)) for option in self.get_options(type(owning_obj)).values()}
 
 
     def __set__(self, owning_obj, value):
@@ -403,6 +544,7 @@ class Options(Option, Options_mixin):
         :param owning_obj: The owning object on which this Option object is set as a class attribute.
         :param value: The new value to upate from. This should be a dict-like object that supports iteration via items().
         """
+        owning_obj._option_write(self)
         self.set_into_dict(owning_obj, owning_obj._configurable_options, value)
         
     def get_sub_dict(self, dict_obj):
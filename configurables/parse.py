@@ -4,16 +4,102 @@ Code for loading Configurables from saved file locations.
 
 import itertools
 import glob
+import io
+import os
+import concurrent.futures
+import contextlib
+import functools
 
-import yaml
-
+from configurables import yaml_io
 from configurables.util import hasopt, getopt, setopt, appendopt
 from configurables.loader import Update_loader, Partial_loader,\
-    Single_loader, Configurable_list
+    Single_loader, Configurable_list, Tag_index
 from configurables.exception import Configurable_loader_exception
+from configurables.cache import Parse_cache, Snapshot
+from configurables.base import Configurable_class_target
+
+
+def parse_yaml(data):
+    """
+    Parse all the documents in the (bytes) contents of a yaml file.
+    
+    :param data: The contents of the file, as bytes.
+    :returns: A list of the parsed documents.
+    """
+    # Decode the same way as opening the file in text mode would.
+    return list(yaml_io.safe_load_all(io.TextIOWrapper(io.BytesIO(data))))
+
+
+def load_file(file_name, cache = None):
+    """
+    Read and parse all the documents in a yaml file.
+    
+    :raises FileNotFoundError: If the file does not exist.
+    :param file_name: The path of the file to read.
+    :param cache: An optional Parse_cache to load from (and save to).
+    :returns: A list of the parsed documents.
+    """
+    if cache is not None:
+        return cache.load(file_name, parse_yaml)
+    
+    with open(file_name, "rt") as file:
+        return list(yaml_io.safe_load_all(file))
+
+
+def read_file(file_name, cache = None):
+    """
+    Read and parse all the documents in a yaml file, ignoring files that no longer exist.
+    
+    This function is also used by worker processes (see Configurables_parser.parse()), so everything it is given and returns must be picklable.
+    
+    :param file_name: The path of the file to read.
+    :param cache: An optional Parse_cache to load from (and save to).
+    :returns: A list of the parsed documents, or None if the file does not exist.
+    """
+    try:
+        return load_file(file_name, cache)
+    
+    except FileNotFoundError:
+        # This should be ok to ignore, just means a file was moved inbetween us looking how many files there are and reading them.
+        # Possibly no need to worry about this?
+        return None
+
+
+def library_fingerprint(definitions):
+    """
+    Get a fingerprint of the sources that parse_loaders() builds its result from.
+    
+    This consists of the path, modification time and size of every file that would be parsed, along with the class handles of every known Configurable_class_target class.
+    
+    :param definitions: Definitions to load (see parse_loaders()).
+    :returns: The fingerprint, a (hashable) tuple.
+    """
+    files = []
+    for TYPE, folders in definitions.items():
+        for file_name in Configurables_parser(*folders, TYPE = TYPE).file_list():
+            try:
+                stat = os.stat(file_name)
+            
+            except FileNotFoundError:
+                continue
+            
+            files.append((TYPE, file_name, stat.st_mtime_ns, stat.st_size))
+    
+    # Classes could have been defined since we last looked, so refresh.
+    handles = sorted(
+        (known_class.__module__, known_class.__qualname__, tuple(vars(known_class)['CLASS_HANDLE']))
+        for known_class in Configurable_class_target.recursive_subclasses(refresh = True)
+        if len(vars(known_class).get('CLASS_HANDLE', [])) > 0
+    )
+    
+    return (
+        tuple((TYPE, tuple(folders)) for TYPE, folders in definitions.items()),
+        tuple(files),
+        tuple(handles)
+    )
 
 
-def parse_loaders(definitions):
+def parse_loaders(definitions, cache_dir = None, snapshot = None, workers = None):
     """
     Load a number of linked Configurable loaders from file.
     
@@ -22,22 +108,35 @@ def parse_loaders(definitions):
     Each item/list should contain the ordered locations to read from. Later entries will have higher precedence over earlier ones.
     
     :param definitions: Definitions to load.
+    :param cache_dir: Optional path to a directory in which to cache parsed files (see Parse_cache).
+    :param snapshot: Optional path to a file in which to store the fully linked result. If the snapshot is up to date (no files or known classes have changed), it is loaded instead of parsing.
+    :param workers: Optional number of processes to parse files with. If None (or 1), files are parsed in this process.
     :returns: A dictionary of Configurable_list objects. Each key will match that given in definitions.
     """
+    if snapshot is not None:
+        # The fingerprint is taken before parsing, so any changes made while we parse will invalidate the snapshot next time.
+        fingerprint = library_fingerprint(definitions)
+        snapshot = Snapshot(snapshot)
+        done = snapshot.load(fingerprint)
+        if done is not None:
+            return done
+    
     parsers = {}
     
-    # Iterate through each configurable type.
-    for TYPE, folders in definitions.items():
-        # Load from the location and add to our silico_options object.
-        # The name of the attribute we add to is the same as the location we read from, but in lower case...
-        try:
-            parser = Configurables_parser(*folders, TYPE = TYPE)
-            parser.parse()
-            parsers[TYPE] = parser
+    # One pool of workers is shared by each type.
+    with (concurrent.futures.ProcessPoolExecutor(workers) if workers is not None and workers > 1 else contextlib.nullcontext()) as executor:
+        # Iterate through each configurable type.
+        for TYPE, folders in definitions.items():
+            # Load from the location and add to our silico_options object.
+            # The name of the attribute we add to is the same as the location we read from, but in lower case...
+            try:
+                parser = Configurables_parser(*folders, TYPE = TYPE, cache_dir = cache_dir, workers = workers)
+                parser.parse(executor)
+                parsers[TYPE] = parser
         
-        except FileNotFoundError:
-            # No need to panic.
-            pass
+            except FileNotFoundError:
+                # No need to panic.
+                pass
     
     done = {parser_type: Configurable_list([], parser_type) for parser_type in parsers.keys()}
     
@@ -45,14 +144,17 @@ def parse_loaders(definitions):
     for index, (TYPE, parser) in enumerate(reversed(parsers.items())):
         # First, link any parents.
         try:
-            parents = parsers[list(parsers.keys())[index -1]].loaders
+            parent_parser = parsers[list(parsers.keys())[index -1]]
+            parents = parent_parser.loaders
+            parents_index = parent_parser.get_tag_index()
         
         except IndexError:
             parents = []
+            parents_index = None
         
         # Process parents and previous.
-        parser.process_parents(parser.has_parents, parents, "parents")
-        parser.process_parents(parser.has_previous, parser.loaders, "previous")
+        parser.process_parents(parser.has_parents, parents, "parents", tag_index = parents_index)
+        parser.process_parents(parser.has_previous, parser.loaders, "previous", tag_index = parser.get_tag_index())
         
         # Now process fully.
         loaders = parser.process(children)
@@ -64,6 +166,9 @@ def parse_loaders(definitions):
         # Save children for next iteration.
         children = done[TYPE]
         
+    if snapshot is not None:
+        snapshot.save(fingerprint, done)
+    
     return done
 
 
@@ -72,14 +177,19 @@ class Configurables_parser():
     Reads and parses all configurable files from a location.
     """
     
-    def __init__(self, *paths, TYPE):
+    def __init__(self, *paths, TYPE, cache_dir = None, workers = None):
         """
         Constructor for Configurables_loader object.
         
         :param paths: Paths to  directories to load .yaml files from. All *.yaml files under each directory will be loaded and processed.
         :param TYPE: The TYPE of the configurables we are loading; this is a string which identifies the type of the configurables (eg, Destination, Calculation etc).
+        :param cache_dir: Optional path to a directory in which to cache parsed files. Files that haven't changed since they were cached are not parsed again.
+        :param workers: Optional number of processes to parse files with. If None (or 1), files are parsed in this process.
         """
         self.root_directories = paths
+        # An optional on-disk cache of parsed files.
+        self.cache = Parse_cache(cache_dir) if cache_dir is not None else None
+        self.workers = workers
         # A type to set for all configurables we load.
         self.TYPE = TYPE
         # A list of the configurable loaders we have parsed.
@@ -93,48 +203,87 @@ class Configurables_parser():
         # link:previous and link:parents work on the same principle, the difference being link:previous refers to loaders of the same type (other calculations for example),
         # while link:parents refers to loaders of a different type (programs being referenced from a calculation, for example).
         self.has_previous = []
+        # An index of our loaders by TAG, see get_tag_index().
+        self._tag_index = None
             
-    def parse(self):
+    def get_tag_index(self):
+        """
+        Get an index of our loaders by TAG.
+        
+        The index is built once, and only rebuilt if more loaders are parsed.
+        """
+        if self._tag_index is None or self._tag_index.size != len(self.loaders):
+            self._tag_index = Tag_index(self.loaders)
+        
+        return self._tag_index
+    
+    def file_list(self):
+        """
+        Get the ordered list of files to parse; all files within our top directories which end in .yaml.
+        """
+        return list(itertools.chain( *(sorted(glob.glob(glob.escape(root_directory) + "/**/*.yaml", recursive = True)) for root_directory in self.root_directories) ))
+    
+    def parse(self, executor = None):
         """
         Read and parse all .yaml files within our directory.
+        
+        Reading and parsing of the files themselves can be performed by a pool of worker processes, but the parsed configs are always processed here in the same order as the files are listed.
+        
+        :param executor: Optional concurrent.futures executor to parse files with. If not given, a process pool is used if this parser has more than one worker, otherwise files are parsed in this process.
         """
-        # Get our file list; all files within our top directory which end in .yaml.
-        file_list = itertools.chain( *(sorted(glob.glob(glob.escape(root_directory) + "/**/*.yaml", recursive = True)) for root_directory in self.root_directories) )
+        file_list = self.file_list()
         
-        # Now parse them.
-        for file_name in file_list:
-            try:
-                with open(file_name, "rt") as file:
-                    # Parse each.
-                    for config in yaml.safe_load_all(file):
-                        if config is None:
-                            continue
+        if executor is None and self.workers is not None and self.workers > 1:
+            with concurrent.futures.ProcessPoolExecutor(self.workers) as executor:
+                return self.parse(executor)
                         
-                        # Before we do anything else, process the namespace option (if given).
-                        # This automatically alters the tag, alias, next, and previous options.
-                        self.process_namespace(config)
+        if executor is not None:
+            # Send files in chunks to save on communication overhead, while still spreading the work between workers.
+            chunksize = max(1, len(file_list) // ((self.workers or os.cpu_count() or 1) * 4))
+            # map() returns results in the same order as the files were given.
+            parsed = executor.map(functools.partial(read_file, cache = self.cache), file_list, chunksize = chunksize)
                         
-                        # If the config has its link:type set to update, file it away separately.
-                        if getopt(config, "link", "type", default = None) == "update":
-                            # An update, no need to pre process.
-                            self.updates.append(Update_loader(file_name, self.TYPE, config))
+        else:
+            parsed = (read_file(file_name, self.cache) for file_name in file_list)
                         
-                        else:
-                            # Normal config, pre process and add.
-                            loader = self.pre_process(config, file_name)
-                            self.loaders.append(loader)
+        # Process each, in order.
+        for file_name, configs in zip(file_list, parsed):
+            if configs is None:
+                continue
                             
-                            # If the loader has link:parents set, add it to our list.
-                            if hasopt(loader.config, "link", "parents"):
-                                self.has_parents.append((loader, loader.config["link"]['parents']))
+            for config in configs:
+                self.add_config(config, file_name)
                             
-                            if hasopt(loader.config, "link", "previous"):
-                                self.has_previous.append((loader, loader.config["link"]['previous']))
+    def add_config(self, config, file_name):
+        """
+        Add a single parsed config dict to this parser.
                     
-            except FileNotFoundError:
-                # This should be ok to ignore, just means a file was moved inbetween us looking how many files there are and reading them.
-                # Possibly no need to worry about this?
-                pass
+        :param config: The config dict.
+        :param file_name: The name of the file the config was read from.
+        """
+        if config is None:
+            return
+        
+        # Before we do anything else, process the namespace option (if given).
+        # This automatically alters the tag, alias, next, and previous options.
+        self.process_namespace(config)
+        
+        # If the config has its link:type set to update, file it away separately.
+        if getopt(config, "link", "type", default = None) == "update":
+            # An update, no need to pre process.
+            self.updates.append(Update_loader(file_name, self.TYPE, config))
+        
+        else:
+            # Normal config, pre process and add.
+            loader = self.pre_process(config, file_name)
+            self.loaders.append(loader)
+            
+            # If the loader has link:parents set, add it to our list.
+            if hasopt(loader.config, "link", "parents"):
+                self.has_parents.append((loader, loader.config["link"]['parents']))
+            
+            if hasopt(loader.config, "link", "previous"):
+                self.has_previous.append((loader, loader.config["link"]['previous']))
     
     def process_namespace(self, config):
         """
@@ -162,30 +311,33 @@ class Configurables_parser():
         """
         Process the config dicts that we have parsed.
         """
+        tag_index = self.get_tag_index()
+        
         # First, apply any updates.
         for update in self.updates:
-            update.update(self.loaders)
+            update.update(self.loaders, tag_index = tag_index)
                 
         # We need to link any partial loaders together.
         for loader in self.loaders:
-            loader.link(self.loaders, children = children)
+            loader.link(self.loaders, children = children, tag_index = tag_index)
             
         # Next we need to purge partial configurables from the top level list.
         conf_list = [loader for loader in self.loaders if loader.TOP]
         return conf_list
     
-    def process_parents(self, loaders, parent_loaders, parents_type = "parents"):
+    def process_parents(self, loaders, parent_loaders, parents_type = "parents", tag_index = None):
         """
         Process any loaders that have a link:previous/link:parents set.
         
         :param: A list of tuples of loaders that have link:parents or link:previous set.
         :param parent_loaders: A list of loaders that could be referred to.
         :param parents_type: One of either "parents" or "previous".
+        :param tag_index: An optional Tag_index of parent_loaders, used to speed up finding loaders by tag.
         """
         for loader, parents in loaders:
             for parent_tag in parents:
                 # Find the loader in the parent list that is referenced.
-                matching = [parent_loader for parent_loader in parent_loaders if parent_loader.TAG == parent_tag]
+                matching = tag_index.find(parent_tag) if tag_index is not None else [parent_loader for parent_loader in parent_loaders if parent_loader.TAG == parent_tag]
                 
                 # Panic if there were no matches
                 if len(matching) == 0:
@@ -194,6 +346,7 @@ class Configurables_parser():
                 # Add the loader to each of the matching loader's NEXT attr.
                 for parent in matching:
                     appendopt(parent.config, "link", "next", value = loader.TAG)
+                    parent.config_changed()
     
     def pre_process(self, config, config_path):
         """
@@ -0,0 +1,106 @@
+"""Tests for generated-code validators and accessors"""
+
+import copy
+
+import pytest
+
+from configurables.base import Configurable
+from configurables.options import Options
+from configurables.option import Option
+from configurables.codegen import get_generated_engine
+from configurables.test.test_validation import Method, Broken
+
+
+class Custom_option(Option):
+    """An Option subclass, which the generated code must call rather than inline."""
+    
+    def validate(self, owning_obj, dict_obj = None):
+        super().validate(owning_obj, dict_obj)
+        dict_obj[self.name] = dict_obj.get(self.name, 0) + 1
+
+
+class Job(Configurable):
+    
+    name = Option(help = "Name", type = str, required = True)
+    values = Option(help = "Values", list_type = tuple, type = float, default = (1.0,))
+    methods = Option(help = "Methods", list_type = list, choices = ["a", "b"], default = lambda option, configurable: ["a"])
+    duration = Option(help = "Duration", default = 10, dump_func = lambda option, configurable, value: "{}s".format(value))
+    counter = Custom_option(help = "Counter")
+    empty = Options(help = "No children")
+    nested = Options(help = "Nested",
+        level = Options(
+            value = Option(help = "Value", default = None, no_none = True),
+        ),
+    )
+
+
+def run_both(cls, func, **kwargs):
+    """Run a function with a new object using both the generated and the interpreted engines, returning the outcome of each."""
+    results = []
+    for engine in ("generated", "interpreted"):
+        obj = cls(validate_now = False, **copy.deepcopy(kwargs))
+        obj.validation_engine = engine
+        try:
+            results.append(("ok", func(obj), obj._configurable_options))
+        
+        except Exception as e:
+            results.append((type(e), str(e), obj._configurable_options))
+    
+    return results
+
+
+@pytest.mark.parametrize("cls, kwargs", [
+    (Method, {"name": "test"}),
+    (Method, {}),
+    (Method, {"name": 12, "charge": "-1", "multiplicity": "2", "keywords": ("opt", 1)}),
+    (Method, {"name": "test", "charge": "one"}),
+    (Method, {"name": "test", "multiplicity": 4}),
+    (Method, {"name": "test", "functional": "pbe0"}),
+    (Method, {"name": "test", "functional": "PBE0", "post_hf": "MP2"}),
+    (Method, {"name": "test", "memory": None}),
+    (Method, {"name": None}),
+    (Method, {"name": "test", "keywords": 5}),
+    (Method, {"name": "test", "dft": {"grid": {"size": "20", "name": "COARSE"}, "dispersion": 1}}),
+    (Method, {"name": "test", "dft": {"grid": {"size": 0}}}),
+    (Method, {"name": "test", "dft": {"grid": {"size": 5000}}}),
+    (Method, {"name": "test", "dft": {"grid": {"shape": "round"}}}),
+    (Method, {"name": "test", "dft": 5}),
+    (Method, {"name": "test", "dft": {"grid": 5}}),
+    (Method, {"name": "test", "solvent": {"model": "PCM", "radius": 5}}),
+    (Method, {"name": "test", "solvent": {"model": "PCM"}, "charge": 1}),
+    (Broken, {}),
+    (Job, {"name": "job"}),
+    (Job, {"name": "job", "values": [1, "2.5"], "methods": ["A", "b"], "duration": 5}),
+    (Job, {"name": "job", "values": ["x"]}),
+    (Job, {"name": "job", "values": 1}),
+    (Job, {"name": "job", "methods": ["c"]}),
+    (Job, {"name": "job", "methods": 1}),
+    (Job, {"name": "job", "nested": {"level": {"value": None}}}),
+    (Job, {"name": "job", "nested": {"level": {"value": 1}}, "empty": {}}),
+])
+@pytest.mark.parametrize("func", [
+    lambda obj: obj.validate(),
+    lambda obj: obj.dump(),
+    lambda obj: obj.dump(True),
+    lambda obj: obj.effective_values(),
+], ids = ["validate", "dump", "dump_explicit", "effective_values"])
+def test_generated_parity(cls, kwargs, func):
+    """Test that generated code gives the same results as the interpreted path."""
+    generated, interpreted = run_both(cls, func, **kwargs)
+    assert generated == interpreted
+
+
+def test_generated_engine():
+    """Test selecting the generated engine."""
+    class Generated_job(Job):
+        validation_engine = "generated"
+    
+    job = Generated_job(name = "job", values = ["2"], nested = {"level": {"value": 3}})
+    assert job.values == (2.0,)
+    assert job.counter == 1
+    assert job.dump() == {'name': 'job', 'values': (2.0,), 'counter': 1, 'nested': {'level': {'value': 3}}}
+    assert job.effective_values()['methods'] == ["a"]
+    
+    # Code is generated once per class.
+    assert get_generated_engine(Generated_job) is get_generated_engine(Generated_job)
+    assert "def validate(owning_obj):" in get_generated_engine(Generated_job).source
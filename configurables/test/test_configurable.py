@@ -1,11 +1,15 @@
 """Tests for configurable objects"""
 
+import copy
+import pickle
+import random
+
 import pytest
 
 from configurables.base import Configurable
 from configurables.options import Options
 from configurables.option import Option
-from configurables.exception import Configurable_option_exception
+from configurables.exception import Configurable_option_exception, Read_only_exception, Disallowed_choice_exception
 
 
 # Setup our two test classes.
@@ -181,4 +185,198 @@ def test_none_to_list(child1):
     child1.validate()
     # Now it's been converted.
     assert child1.list_items == []
-    assert child1.none_items is None
\ No newline at end of file
+    assert child1.none_items is None
+
+
+def test_options_cache(child1, parent):
+    """Test that inherited sub options are cached per owning class."""
+    dft = Child.get_cls_option("dft")
+    
+    # Repeated lookups should give the same (cached) object.
+    assert dft.get_options(Child) is dft.get_options(Child)
+    assert set(dft.get_options(Child)) == {"functional", "grid"}
+    
+    # Classes created on the fly get their own options.
+    Dynamic = type("Dynamic", (Child,), {"dft": Options(basis = Option(help = "Basis set", default = "STO-3G"))})
+    assert set(Dynamic.get_cls_option("dft").get_options(Dynamic)) == {"functional", "grid", "basis"}
+    assert set(dft.get_options(Child)) == {"functional", "grid"}
+    
+    obj = Dynamic()
+    assert obj.dft['basis'] == "STO-3G"
+    assert obj.dft['grid']['grid_name'] == "big"
+    
+    # Nested reads still resolve through inheritance.
+    assert child1.dft['grid']['size'] == 10
+    assert parent.get_options()['dft'].get_options(Parent)['grid'].get_options(Parent).keys() == {"size"}
+
+
+
+def test_mapping_reuse(child1):
+    """Test that Options mappings are reused between reads."""
+    assert child1.dft is child1.dft
+    assert child1.dft['grid'] is child1.dft['grid']
+    
+    # Missing sub dicts are still created as needed.
+    child1.dft['grid']['size'] = 20
+    del child1._configurable_options['dft']
+    assert child1.dft['grid']['size'] == 10
+    child1.dft['grid']['size'] = 30
+    assert child1._configurable_options == {"dft": {"grid": {"size": 30}}}
+    
+    # Copies get their own mappings, even shallow copies that share our options.
+    shallow = copy.copy(child1)
+    assert shallow.dft['grid'].owning_obj is shallow
+    assert child1.dft['grid'].owning_obj is child1
+    
+    for copied in (child1.copy(), pickle.loads(pickle.dumps(child1))):
+        copied.dft['grid']['size'] = 40
+        assert copied.dft['grid']['size'] == 40
+        assert copied.dft['grid'].owning_obj is copied
+        assert child1.dft['grid']['size'] == 30
+
+
+def test_read_only(child1):
+    """Test copying configurables and making them read-only."""
+    child1.dft['functional'] = "PBE"
+    child1.list_items = ["a"]
+    
+    copied = child1.copy()
+    copied.dft['grid']['size'] = 20
+    copied.list_items.append("b")
+    assert copied.dump() == {"dft": {"functional": "PBE", "grid": {"size": 20}}, "list_items": ["a", "b"]}
+    assert child1.dump() == {"dft": {"functional": "PBE"}, "list_items": ["a"]}
+    
+    child1.make_read_only()
+    for change in (
+        lambda: setattr(child1, "list_items", []),
+        lambda: delattr(child1, "list_items"),
+        lambda: child1.dft.__setitem__("functional", "B3LYP"),
+        lambda: child1.dft['grid'].__delitem__("size"),
+        lambda: setattr(child1, "dft", {"functional": "B3LYP"}),
+        lambda: child1.deep_merge({"scf": False}),
+    ):
+        with pytest.raises(Read_only_exception):
+            change()
+    
+    assert child1.dump() == {"dft": {"functional": "PBE"}, "list_items": ["a"]}
+    
+    # Read-only configurables can still be read, validated and copied.
+    child1.validate()
+    assert child1.dft['functional'] == "PBE"
+    copied = child1.copy()
+    copied.list_items = ["c"]
+    assert copied.list_items == ["c"]
+
+
+def test_freeze(child1):
+    """Test freezing configurables."""
+    child1.dft['grid']['size'] = "20"
+    child1.list_items = ["a"]
+    values = child1.freeze()
+    
+    assert child1.freeze() is values
+    assert values == dict(child1.effective_values(), list_items = ["a"], none_items = [])
+    assert values['dft']['grid'] == {"size": 20, "grid_name": "big"}
+    assert child1.dft['grid']['size'] == 20
+    assert child1._post_hf == "off"
+    assert child1.dft is values['dft']
+    
+    # Mutable values are frozen too, but still compare equal to the originals.
+    assert child1.list_items == ["a"]
+    assert child1._configurable_options['list_items'] is not child1.list_items
+    frozen_dict = child1.freeze_value({"a": [1, {"b"}], "c": (2, [3]), "d": frozenset("e")}, ("list_items",))
+    assert frozen_dict == {"a": [1, {"b"}], "c": (2, [3]), "d": frozenset("e")}
+    for change in (
+        lambda: frozen_dict.__setitem__("c", 2),
+        lambda: frozen_dict['a'].append(2),
+        lambda: frozen_dict['a'].__iadd__([2]),
+        lambda: frozen_dict['a'][1].add("c"),
+        lambda: frozen_dict['a'][1].__ior__({"c"}),
+        lambda: frozen_dict['c'][1].sort(),
+    ):
+        with pytest.raises(Read_only_exception, match = "list_items"):
+            change()
+    
+    assert frozen_dict == {"a": [1, {"b"}], "c": (2, [3]), "d": frozenset("e")}
+    assert pickle.loads(pickle.dumps(frozen_dict['a'])) == [1, {"b"}]
+    
+    for change in (
+        lambda: setattr(child1, "_post_hf", "MP2"),
+        lambda: delattr(child1, "list_items"),
+        lambda: child1.dft.__setitem__("functional", "PBE"),
+        lambda: child1.dft['grid'].pop("size"),
+        lambda: values.update(scf = False),
+        lambda: child1.list_items.append("b"),
+        lambda: child1.deep_merge({"scf": False}),
+    ):
+        with pytest.raises(Read_only_exception):
+            change()
+    
+    with pytest.raises(Read_only_exception, match = "dft: grid"):
+        child1.dft['grid']['size'] = 30
+    
+    assert child1.dft['grid']['size'] == 20
+    
+    # Copies aren't frozen.
+    copied = child1.copy()
+    copied.dft['grid']['size'] = 30
+    assert copied.dft['grid']['size'] == 30
+    
+    unpickled = pickle.loads(pickle.dumps(child1))
+    assert unpickled.dft['grid']['size'] == 20
+    with pytest.raises(Read_only_exception):
+        unpickled.dft['grid']['size'] = 30
+
+
+class Choice():
+    """A choice with its own idea of equality."""
+    
+    def __eq__(self, other):
+        return other == "any"
+
+
+def linear_choice(choices, value):
+    """Match a value against choices one at a time."""
+    for choice in choices:
+        if value == choice:
+            return value
+        
+        elif isinstance(value, str) and isinstance(choice, str) and value.lower() == choice.lower():
+            return choice
+    
+    raise ValueError(value)
+
+
+def test_choices():
+    """Test that indexed choices match the same as comparing against each in turn."""
+    rand = random.Random(21)
+    pool = ["a", "A", "b", "B3LYP", "b3lyp", 1, 1.0, True, 0, False, None, 2.5, (1, 2), Choice()]
+    option = Option("choice", help = "Choice")
+    for _ in range(200):
+        option.choices = rand.sample(pool[:-1] if rand.random() < 0.8 else pool, rand.randint(1, 8))
+        for value in pool[:-1] + ["B3lyp", "c", 3, "any"]:
+            try:
+                expected = linear_choice(option.choices, value)
+            
+            except ValueError:
+                with pytest.raises(Disallowed_choice_exception):
+                    option.validate_choices(value, None)
+            
+            else:
+                result = option.validate_choices(value, None)
+                assert result == expected and type(result) is type(expected)
+    
+    # Choices are copied when set, so changing the original list doesn't leave the index stale.
+    choices = ["a", "b"]
+    option.choices = choices
+    choices[1] = "c"
+    assert option.choices == ("a", "b")
+    assert option.validate_choices("B", None) == "b"
+    with pytest.raises(Disallowed_choice_exception):
+        option.validate_choices("c", None)
+    
+    # Setting new choices updates the index.
+    option.choices = ["a", "c"]
+    assert option.validate_choices("C", None) == "c"
+    with pytest.raises(Disallowed_choice_exception):
+        option.validate_choices("b", None)
@@ -0,0 +1,69 @@
+"""Tests for copy-on-write layered dicts"""
+
+import copy
+import pickle
+
+import pytest
+
+from configurables.layered import Layered_dict
+
+
+def make_parent():
+    return {"a": 1, "b": {"c": [1, 2], "d": {"e": 1}}, "f": [{"g": 1}]}
+
+
+def test_layered_dict():
+    """Test reading and writing through layered dicts."""
+    parent = make_parent()
+    layered = Layered_dict(parent)
+    
+    # Reads fall through to the parent.
+    assert layered == make_parent()
+    assert dict(layered) == make_parent()
+    assert {**layered} == make_parent()
+    assert len(layered) == 3
+    assert "b" in layered and "z" not in layered
+    assert isinstance(layered['b'], dict)
+    
+    # Writes (including to nested values) never reach the parent.
+    layered['b']['d']['e'] = 2
+    layered['b']['c'].append(3)
+    layered['f'][0]['g'] = 2
+    del layered['a']
+    layered['z'] = 26
+    assert parent == make_parent()
+    assert layered == {"b": {"c": [1, 2, 3], "d": {"e": 2}}, "f": [{"g": 2}], "z": 26}
+    assert list(layered) == ["b", "f", "z"]
+    assert "a" not in layered
+    assert layered.get("a") is None
+    
+    with pytest.raises(KeyError):
+        layered['a']
+    
+    with pytest.raises(KeyError):
+        del layered['a']
+    
+    # Deleted keys can be set again.
+    layered['a'] = 3
+    assert layered.pop("a") == 3
+    assert layered.pop("a", None) is None
+    assert layered.setdefault("a", 4) == 4
+    
+    # Any number of layers can share a parent.
+    assert Layered_dict(parent) == make_parent()
+    assert Layered_dict(Layered_dict(parent), {"a": 5})['a'] == 5
+    
+    layered.clear()
+    assert layered == {} and len(layered) == 0
+    assert parent == make_parent()
+
+
+def test_layered_dict_copy():
+    """Test that copies of layered dicts are real dicts."""
+    layered = Layered_dict(make_parent())
+    layered['b']['d']['e'] = 2
+    expected = {"a": 1, "b": {"c": [1, 2], "d": {"e": 2}}, "f": [{"g": 1}]}
+    
+    for copied in (copy.deepcopy(layered), pickle.loads(pickle.dumps(layered)), layered.to_dict()):
+        assert type(copied) is dict and type(copied['b']) is dict and type(copied['b']['d']) is dict
+        assert copied == expected
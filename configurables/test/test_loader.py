@@ -0,0 +1,579 @@
+"""Tests for configurable loaders"""
+
+import json
+import random
+import re
+
+import pytest
+
+from configurables.base import Configurable_class_target
+from configurables.option import Option, Nested_dict_type
+from configurables.options import Options
+from configurables.cache import Resolve_cache, Method_cache
+from configurables.loader import Tag_index, Partial_loader, Single_loader, Update_loader
+from configurables.exception import Configurable_loader_exception, Unresolvable_tag_path_error, Read_only_exception, Configurable_option_exception
+
+
+class Loader_methods(Configurable_class_target):
+    
+    CLASS_HANDLE = ("loader_methods",)
+
+
+class Loader_method(Loader_methods):
+    
+    CLASS_HANDLE = ("loader_method",)
+    
+    keywords = Option(help = "Keywords", list_type = list, type = str, default = ())
+    extra = Option(help = "Extra options", type = Nested_dict_type, default = None)
+
+
+class Loader_grouped(Loader_methods):
+    
+    CLASS_HANDLE = ("loader_grouped",)
+    
+    group = Options(help = "Grouped options", values = Option(help = "Values", default = None))
+
+
+def test_tag_index():
+    """Test finding loaders by tag with an index."""
+    loaders = [Single_loader(None, "loader_methods", {"link": {"tag": tag}}) for tag in ["a", "b", "a", None]]
+    index = Tag_index(loaders)
+    
+    for tag in ["a", "b", "c", 1, 1.0, True, None, ["a"]]:
+        assert index.find(tag) == [loader for loader in loaders if loader.TAG == tag]
+    
+    # Unhashable tags fall back to a linear search.
+    loaders.append(Single_loader(None, "loader_methods", {"link": {"tag": ["a"]}}))
+    index = Tag_index(loaders)
+    assert index.find(["a"]) == [loaders[-1]]
+    assert index.find("a") == [loaders[0], loaders[2]]
+    
+    # Error messages are unchanged.
+    partial = Partial_loader(None, "loader_methods", {"link": {"tag": "p", "next": ["a", "missing"]}})
+    with pytest.raises(Configurable_loader_exception, match = "link:next tag 'missing' could not be found"):
+        partial.link(loaders, tag_index = index)
+    
+    partial = Partial_loader(None, "loader_methods", {"link": {"tag": "p", "next": ["a", ["b"]]}})
+    with pytest.raises(Configurable_loader_exception, match = "cannot use a link:next tag"):
+        partial.link(loaders[:-1], tag_index = Tag_index(loaders[:-1]))
+
+
+def find_result(loader, tag, search):
+    """The result of finding a tag, or the error raised."""
+    try:
+        return ("found", loader.find_by_search(tag) if search else loader.find(tag))
+    
+    except Unresolvable_tag_path_error as error:
+        return ("unresolvable", error.possible_loaders)
+    
+    except Exception as error:
+        return ("missing", str(error))
+
+
+def random_tree(rand, tags, size):
+    """Make a random tree (which can occasionally share and repeat children) of loaders."""
+    loaders = []
+    # Loaders that aren't a child yet.
+    unused = []
+    for index in range(size):
+        tag = rand.choice(tags)
+        if index > 0 and rand.random() < 0.6:
+            loader = Partial_loader(None, "loader_methods", {"link": {"tag": tag}})
+            for _ in range(rand.randint(0, 3)):
+                if len(unused) > 0 and rand.random() < 0.8:
+                    loader.NEXT.append(unused.pop(rand.randrange(len(unused))))
+                
+                else:
+                    loader.NEXT.append(rand.choice(loaders))
+        
+        else:
+            loader = Single_loader(None, "loader_methods", {"link": {"tag": tag}})
+        
+        loaders.append(loader)
+        unused.append(loader)
+    
+    return loaders
+
+
+def test_find_index():
+    """Test that finding loaders with the tag index gives the same results as searching."""
+    rand = random.Random(0)
+    tags = ["a", "b", "c", "d", "e", None]
+    for _ in range(100):
+        loaders = random_tree(rand, tags, rand.randint(1, 25))
+        for loader in loaders:
+            for tag in tags + ["missing"]:
+                assert find_result(loader, tag, False) == find_result(loader, tag, True)
+        
+        # The index is updated when loaders change.
+        if len(loaders) < 3:
+            continue
+        
+        loader = loaders[-1]
+        loader.NEXT.append(rand.choice(loaders[:-1]))
+        loaders[1].NEXT.insert(0, loaders[0])
+        
+        for tag in tags:
+            assert find_result(loader, tag, False) == find_result(loader, tag, True)
+    
+    # Unhashable tags (and loaders that can't be indexed) are searched instead.
+    loaders = random_tree(rand, ["a", ["b"]], 10)
+    for tag in ["a", ["b"]]:
+        assert find_result(loaders[-1], tag, False) == find_result(loaders[-1], tag, True)
+
+
+def linear_path_by_index(loader, index, parent_offset = 0):
+    """Find a loader path by index by walking each loader's children in turn."""
+    if len(loader.NEXT) == 0 and not isinstance(loader, Partial_loader):
+        return [loader]
+    
+    child_offset = 0
+    for child in loader.NEXT:
+        if (index -1) < parent_offset + child_offset + child.size():
+            return [loader] + linear_path_by_index(child, index, parent_offset + child_offset)
+        
+        child_offset += child.size()
+    
+    raise IndexError()
+
+
+def test_path_by_index():
+    """Test converting between indexes and loader paths."""
+    rand = random.Random(0)
+    for _ in range(50):
+        loaders = random_tree(rand, ["a"], rand.randint(1, 25))
+        root = Partial_loader(None, "loader_methods", {"link": {"tag": "root"}})
+        root.NEXT = loaders
+        
+        for _ in range(2):
+            for index in range(-1, root.size() +2):
+                if index < 1:
+                    # Indexes start at 1.
+                    with pytest.raises(IndexError):
+                        root.path_by_index(index)
+                    
+                    continue
+                
+                try:
+                    expected = linear_path_by_index(root, index)
+                
+                except IndexError:
+                    with pytest.raises(IndexError):
+                        root.path_by_index(index)
+                    
+                    continue
+                
+                path = root.path_by_index(index)
+                assert path == expected
+                
+                if 1 <= index <= root.size() and all(len(loader.NEXT) == len(set(loader.NEXT)) for loader in path):
+                    assert root.index_of_path(path) == index
+            
+            # Offsets are updated when loaders are added.
+            root.NEXT.extend(random_tree(rand, ["b"], rand.randint(1, 5)))
+    
+    with pytest.raises(ValueError):
+        root.index_of_path([root, Single_loader(None, "loader_methods", {"link": {"tag": "c"}})])
+
+
+def test_iter():
+    """Test iterating through the configurables under a loader."""
+    rand = random.Random(0)
+    for _ in range(20):
+        loaders = []
+        for index in range(rand.randint(1, 20)):
+            config = {"link": {"tag": str(index)}, "keywords": [str(index)], "extra": {str(index % 3): {"index": index}}}
+            if index > 0 and rand.random() < 0.6:
+                loader = Partial_loader(None, "loader_methods", config)
+                loader.NEXT = rand.sample(loaders, min(len(loaders), rand.randint(0, 3)))
+            
+            else:
+                config['meta'] = {"class_name": "loader_method", "name": str(index)}
+                loader = Single_loader(None, "loader_methods", config)
+            
+            loaders.append(loader)
+        
+        root = Partial_loader(None, "loader_methods", {"link": {"tag": "root"}, "keywords": ["root"]})
+        root.NEXT = loaders
+        
+        expected = [root.resolve(index, validate = False) for index in range(1, root.size() +1)]
+        assert [(configurable.loader_list, configurable.dump(True)) for configurable in root] == \
+            [(configurable.loader_list, configurable.dump(True)) for configurable in expected]
+
+
+def test_merged_prefix():
+    """Test that merged configs are cached, but not reused once changed."""
+    single = Single_loader(None, "loader_methods", {"link": {"tag": "single"}, "meta": {"class_name": "loader_method"}, "keywords": ["single"]})
+    partial = Partial_loader(None, "loader_methods", {"link": {"tag": "partial"}, "keywords": ["partial"], "extra": {"a": {"b": 1}}})
+    partial.NEXT = [single]
+    root = Partial_loader(None, "loader_methods", {"link": {"tag": "root"}, "keywords": ["root"]})
+    root.NEXT = [partial]
+    
+    configurable = root.resolve(1)
+    assert configurable.keywords == ["root", "partial", "single"]
+    assert configurable.loader_list == [root, partial, single]
+    
+    # Changing a resolved configurable doesn't change the cache.
+    configurable.keywords.append("changed")
+    configurable.extra['a']['b'] = 2
+    configurable = root.resolve(1)
+    assert configurable.keywords == ["root", "partial", "single"]
+    assert configurable.extra == {"a": {"b": 1}}
+    
+    # But changing loaders does.
+    Update_loader(None, "loader_methods", {"link": {"tag": "partial"}, "extra": {"a": {"b": 3}}}).update([partial])
+    assert root.resolve(1).extra == {"a": {"b": 3}}
+    
+    root.config = {"link": {"tag": "root"}, "keywords": ["new root"]}
+    assert root.resolve(1).keywords == ["new root", "partial", "single"]
+
+
+def test_resolve_plain_dicts():
+    """Test that resolved configurables only contain real dicts."""
+    single = Single_loader(None, "loader_methods", {"link": {"tag": "single"}, "meta": {"class_name": "loader_grouped"}, "group": {"values": {"c": 2}}})
+    partial = Partial_loader(None, "loader_methods", {"link": {"tag": "partial"}, "group": {"values": {"a": {"b": 1}}}})
+    partial.NEXT = [single]
+    root = Partial_loader(None, "loader_methods", {"link": {"tag": "root"}})
+    root.NEXT = [partial]
+    
+    for _ in range(2):
+        configurable = root.resolve(1)
+        assert type(configurable.group['values']) is dict
+        assert json.loads(json.dumps(configurable.group['values'])) == {"a": {"b": 1}, "c": 2}
+        assert json.loads(json.dumps(configurable.dump()))['group'] == {"values": {"a": {"b": 1}, "c": 2}}
+        configurable.group['values']['a']['b'] = 3
+
+
+def test_resolve_cache():
+    """Test caching resolved configurables."""
+    loaders = [Single_loader(None, "loader_methods", {"link": {"tag": str(index)}, "meta": {"class_name": "loader_method"}, "keywords": [str(index)]}) for index in range(3)]
+    root = Partial_loader(None, "loader_methods", {"link": {"tag": "root"}})
+    root.NEXT = loaders
+    
+    root.resolve_cache = Resolve_cache(max_size = 2)
+    first = root.resolve(1)
+    assert root.resolve("1") is not first
+    assert root.resolve("1").dump() == first.dump()
+    
+    # Copies are independent.
+    first.keywords.append("changed")
+    assert root.resolve(1).keywords == ["0"]
+    assert root.resolve_cache.stats() == {"hits": 3, "misses": 1, "evictions": 0, "size": 1, "max_size": 2}
+    
+    # Validation is part of the key.
+    root.resolve(1, validate = False)
+    root.resolve(2)
+    assert root.resolve_cache.stats() == {"hits": 3, "misses": 3, "evictions": 1, "size": 2, "max_size": 2}
+    
+    # Least recently used configurables are evicted first.
+    root.resolve(2)
+    root.resolve(3)
+    root.resolve(2)
+    assert root.resolve_cache.stats()['hits'] == 5
+    
+    # Changed loaders aren't resolved from the cache.
+    Update_loader(None, "loader_methods", {"link": {"tag": "1"}, "keywords": ["updated"]}).update(loaders)
+    assert root.resolve(2).keywords == ["1", "updated"]
+    
+    root.resolve_cache.clear()
+    assert len(root.resolve_cache) == 0
+    
+    # Read-only configurables are shared, so they are frozen and can't be changed in place either.
+    root.resolve_cache = Resolve_cache(read_only = True)
+    assert root.resolve(1) is root.resolve(1)
+    for change in (
+        lambda: setattr(root.resolve(1), "keywords", []),
+        lambda: root.resolve(1).keywords.append("corrupt"),
+    ):
+        with pytest.raises(Read_only_exception):
+            change()
+    
+    assert root.resolve(1).keywords == ["0"]
+    
+    # Including nested values.
+    nested = Single_loader(None, "loader_methods", {"link": {"tag": "nested"}, "meta": {"class_name": "loader_method"}, "extra": {"a": {"b": [1]}}})
+    root.NEXT = [nested]
+    with pytest.raises(Read_only_exception):
+        root.resolve(1).extra['a']['b'] = 99
+    
+    with pytest.raises(Read_only_exception):
+        root.resolve(1).extra['a']['b'].append(2)
+    
+    assert root.resolve(1).extra == {"a": {"b": [1]}}
+    
+    with pytest.raises(ValueError):
+        Resolve_cache(max_size = 0)
+
+
+def test_freeze_finalize():
+    """Test making classes from frozen configurables."""
+    template = Loader_method(meta = {"name": "template", "TYPE": "test"}, keywords = ["a"], extra = {"b": {"c": [1]}})
+    values = template.freeze()
+    assert values['keywords'] == ["a"]
+    
+    # Other types are copied.
+    assert values['extra'] == template._configurable_options['extra']
+    assert values['extra'] is not template._configurable_options['extra']
+    
+    template.finalize()
+    made = template()
+    assert made.keywords == ["a"] and not made.read_only
+    made.keywords = ["b"]
+    assert made.keywords == ["b"]
+    assert template.keywords == ["a"]
+
+
+def method_library():
+    """Make a library of three linked types (destinations, programs and calculations) of loaders."""
+    def make_type(tags, children = None):
+        loaders = []
+        for tag in tags:
+            config = {"link": {"tag": tag}, "meta": {"class_name": "loader_method"}, "keywords": [tag]}
+            if children is not None:
+                config['link']['next'] = [child.TAG for child in children.NEXT if child.TAG != "bad"]
+            
+            loaders.append(Single_loader(None, "loader_methods", config))
+        
+        top = Partial_loader(None, "loader_methods", {"link": {"tag": "top"}})
+        top.NEXT = loaders
+        for loader in loaders:
+            loader.link(loaders, children)
+        
+        return top
+    
+    calculations = make_type(["c1", "c2", "bad"])
+    # An invalid configurable.
+    calculations.NEXT[2].config['keywords'] = 5
+    programs = make_type(["p1", "p2"], calculations)
+    # p2 can only run c1.
+    programs.NEXT[1].CHILDREN.pop()
+    return make_type(["d1"], programs)
+
+
+def test_resolve_many():
+    """Test resolving batches of identifiers."""
+    root = Partial_loader(None, "loader_methods", {"link": {"tag": "root"}, "keywords": ["root"]})
+    root.NEXT = [Single_loader(None, "loader_methods", {"link": {"tag": tag}, "meta": {"class_name": "loader_method"}, "keywords": [tag]}) for tag in ["a", "b"]]
+    root.NEXT[1].config['keywords'] = 5
+    identifiers = [1, "a", ["a"], 2, "missing", 1]
+    
+    results = root.resolve_many(identifiers)
+    assert [result.keywords for result in (results[0], results[1], results[2], results[5])] == [["root", "a"]] * 4
+    assert isinstance(results[3], Exception)
+    assert "missing" in str(results[4])
+    
+    # Results are independent of each other.
+    assert len({id(result) for result in results}) == len(results)
+    results[0].keywords.append("changed")
+    assert results[5].keywords == ["root", "a"]
+    
+    assert root.resolve_many([2], validate = False)[0].keywords == 5
+    
+    # Lazily validated configurables only raise when the invalid option is read.
+    lazy = root.resolve_many([2], validate = "lazy")[0]
+    with pytest.raises(Configurable_option_exception):
+        lazy.keywords
+
+
+def test_resolve_method_strings():
+    """Test resolving batches of method strings."""
+    destinations = method_library()
+    identifiers = ["1/1/1", "d1/p1/c2", "1/1/1", "1/2/2", "1/p1/bad", "1/1", None, "1/p2/1"]
+    
+    results = destinations.resolve_method_strings(identifiers)
+    assert [[part.keywords for part in results[index]] for index in (0, 1, 2, 7)] == [
+        [["d1"], ["p1"], ["c1"]],
+        [["d1"], ["p1"], ["c2"]],
+        [["d1"], ["p1"], ["c1"]],
+        [["d1"], ["p2"], ["c1"]],
+    ]
+    assert all(isinstance(results[index], Exception) for index in (3, 4, 5, 6))
+    
+    # The same as resolving one at a time.
+    for identifier, result in zip(identifiers, results):
+        if not isinstance(result, Exception):
+            assert [part.dump() for part in destinations.resolve_method_string(identifier)] == [part.dump() for part in result]
+        
+        else:
+            with pytest.raises(Exception):
+                destinations.resolve_method_string(identifier)
+    
+    # No part is shared between results.
+    assert len({id(part) for result in (results[0], results[1], results[2]) for part in result}) == 9
+
+
+def test_method_cache():
+    """Test caching compiled method strings."""
+    destinations = method_library()
+    first = destinations.resolve_method_string("1/1/2")
+    assert [part.keywords for part in destinations.resolve_method_string(" 1 / 1/2")] == [part.keywords for part in first]
+    assert destinations.resolve_method_string("d1/p1/c2")[2].keywords == ["c2"]
+    
+    # Resolved configurables are never shared.
+    assert destinations.resolve_method_string("1/1/2")[0] is not first[0]
+    
+    stats = destinations.method_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size'], stats['hit_rate']) == (2, 2, 2, 0.5)
+    
+    # Strings that can't be compiled are cached too, and aren't compiled again.
+    compile_method_string = destinations.compile_method_string
+    compiled = []
+    destinations.compile_method_string = lambda identifier: compiled.append(identifier) or compile_method_string(identifier)
+    for identifier in ("1/2/2", "1/2/2", "1/1"):
+        with pytest.raises(Exception):
+            destinations.resolve_method_string(identifier)
+    
+    del destinations.compile_method_string
+    assert compiled == ["1/2/2", "1/1"]
+    assert len(destinations.method_cache) == 4
+    assert destinations.method_cache.stats()['hits'] == 3
+    
+    # Errors are the same as resolving each part in turn (bad is both an invalid configurable and an invalid child).
+    with pytest.raises(Exception) as expected:
+        destinations.resolve_method("d1", "p2", "bad")
+    
+    assert "not a valid child" not in str(expected.value)
+    with pytest.raises(type(expected.value), match = re.escape(str(expected.value))):
+        destinations.resolve_method_string("d1/p2/bad")
+    
+    # Changing links between loaders empties the cache.
+    calculations = destinations.NEXT[0].top_child.NEXT[0].top_child
+    calculations.NEXT.reverse()
+    assert destinations.resolve_method_string("1/1/2")[2].keywords == ["c2"]
+    assert destinations.method_cache.stats()['invalidations'] == 1
+    assert len(destinations.method_cache) == 1
+    
+    # The cache can be disabled.
+    destinations.method_cache = None
+    assert destinations.resolve_method_string("1/1/3")[2].keywords == ["c1"]
+    assert destinations.method_cache is None
+    
+    with pytest.raises(ValueError):
+        Method_cache(max_size = 0)
+
+
+def test_valid_child_path():
+    """Test checking child paths with an index."""
+    rand = random.Random(18)
+    loaders = [Single_loader(None, "loader_methods", {"link": {"tag": str(index)}}) for index in range(5)]
+    
+    for _ in range(100):
+        single = Single_loader(None, "loader_methods", {"link": {"tag": "single"}})
+        single.CHILDREN = [rand.choices(loaders, k = rand.randint(0 if rand.random() < 0.05 else 1, 3)) for index in range(rand.randint(0, 4))]
+        
+        for _ in range(20):
+            possible = rand.choices(loaders, k = rand.randint(0, 4))
+            assert single.valid_child_path(possible) == any(possible[:len(child_path)] == child_path for child_path in single.CHILDREN)
+            
+            # Changing our children updates the index.
+            if rand.random() < 0.2:
+                single.CHILDREN.append(possible)
+                assert single.valid_child_path(possible)
+                single.CHILDREN.pop()
+
+
+def linear_methods(top):
+    """Find every valid method by checking every combination of indices in turn."""
+    methods = []
+    for index in range(1, top.size() +1):
+        path = top.path_by_index(index)
+        if path[-1].top_child is None:
+            methods.append(((index,), (tuple(loader.TAG for loader in path[1:]),)))
+            continue
+        
+        for indices, tag_paths in linear_methods(path[-1].top_child):
+            if path[-1].valid_child_path(path[-1].top_child.path_by_index(indices[0])):
+                methods.append(((index,) + indices, (tuple(loader.TAG for loader in path[1:]),) + tag_paths))
+    
+    return methods
+
+
+def test_iter_methods():
+    """Test enumerating valid methods without resolving."""
+    rand = random.Random(19)
+    for _ in range(30):
+        top = None
+        for depth in range(rand.randint(1, 3)):
+            loaders = random_tree(rand, ["a", "b", "c"], rand.randint(1, 12))
+            parent = Partial_loader(None, "loader_methods", {"link": {"tag": "top"}})
+            parent.NEXT = rand.sample(loaders, rand.randint(1, len(loaders)))
+            
+            if top is not None:
+                # Link to the previous TYPE with random (possibly overlapping) child paths.
+                for loader in loaders:
+                    if not loader.partial:
+                        loader.top_child = top
+                        for _ in range(rand.randint(0, 3)):
+                            if top.size() > 0:
+                                path = top.path_by_index(rand.randint(1, top.size()))
+                                loader.CHILDREN.append(path[:rand.randint(0 if rand.random() < 0.05 else 1, len(path))])
+            
+            top = parent
+        
+        expected = linear_methods(top)
+        assert list(top.iter_methods()) == expected
+        assert top.method_count() == len(expected)
+        
+        # Skipping methods.
+        for start in (1, 2, len(expected) // 2, len(expected) -1, len(expected), len(expected) +1):
+            assert list(top.iter_methods(start)) == expected[start:]
+    
+    
+    # Indices and tags can be resolved.
+    destinations = method_library()
+    methods = list(destinations.iter_methods())
+    assert len(methods) == destinations.method_count() == 3
+    for indices, tag_paths in methods:
+        assert [part.loader_list[1:] for part in destinations.resolve_method(*indices)] == \
+            [part.loader_list[1:] for part in destinations.resolve_method(*[list(tag_path) for tag_path in tag_paths])]
+
+
+def linear_concrete_children(loader, show_hidden, current_path = []):
+    """Find the concrete children of a loader, the same way as before they were cached."""
+    paths = []
+    for child_path in loader.sub_node_paths:
+        if not show_hidden and any(item.config.get("meta", {}).get("hidden", False) for item in child_path):
+            continue
+        
+        if child_path[-1].pseudo:
+            paths.extend(linear_concrete_children(child_path[-1], show_hidden, current_path + list(child_path)))
+        
+        else:
+            paths.append(current_path + list(child_path))
+    
+    return paths
+
+
+def test_concrete_children():
+    """Test getting (cached) concrete children."""
+    rand = random.Random(20)
+    for _ in range(50):
+        loaders = random_tree(rand, ["a", "b"], rand.randint(1, 15))
+        for loader in loaders:
+            loader.pseudo = rand.random() < 0.3
+            if rand.random() < 0.2:
+                loader.config = {"link": {"tag": loader.TAG}, "meta": {"hidden": True}}
+        
+        single = Single_loader(None, "loader_methods", {"link": {"tag": "single"}})
+        single.CHILDREN = [[loader] for loader in rand.sample(loaders, rand.randint(0, len(loaders)))]
+        
+        for _ in range(3):
+            for loader in loaders + [single]:
+                for show_hidden in (False, True):
+                    expected = linear_concrete_children(loader, show_hidden)
+                    assert loader.get_concrete_children(show_hidden) == expected
+                    assert list(loader.iter_concrete_children(show_hidden)) == expected
+                    
+                    # Returned paths are our own to change.
+                    loader.get_concrete_children(show_hidden).append(None)
+                    assert loader.get_concrete_children(show_hidden) == expected
+            
+            # Changing children or hidden flags updates the cache.
+            changed = rand.choice(loaders)
+            if changed.partial and rand.random() < 0.5:
+                changed.NEXT.append(rand.choice(loaders[:loaders.index(changed)] or [single]))
+            
+            else:
+                changed.config = {"link": {"tag": changed.TAG}, "meta": {"hidden": not changed.hidden}}
+            
+            single.CHILDREN.append([rand.choice(loaders)])
@@ -0,0 +1,67 @@
+"""Tests for merging config dicts"""
+
+import copy
+import random
+
+import deepmerge
+
+from configurables.merge import merge
+
+
+def random_value(rand, depth = 0):
+    """Make a random config value; scalars, lists, tuples, sets or (nested) dicts."""
+    choice = rand.randrange(8 if depth < 4 else 5)
+    if choice == 0:
+        return rand.randrange(3)
+    
+    elif choice == 1:
+        return rand.choice(["a", "b", None, True, 1.5])
+    
+    elif choice == 2:
+        return [rand.randrange(3) for index in range(rand.randrange(3))]
+    
+    elif choice == 3:
+        return {rand.randrange(3) for index in range(rand.randrange(3))}
+    
+    elif choice == 4:
+        return tuple(rand.randrange(3) for index in range(rand.randrange(3)))
+    
+    else:
+        # Few distinct keys, so the two sides of a merge often overlap.
+        return {rand.choice("abcd"): random_value(rand, depth +1) for index in range(rand.randrange(4))}
+
+
+def test_merge():
+    """Test that merge() gives the same results as deepmerge."""
+    rand = random.Random(15)
+    for iteration in range(2000):
+        base = random_value(rand)
+        nxt = random_value(rand)
+        
+        expected = deepmerge.always_merger.merge(copy.deepcopy(base), copy.deepcopy(nxt))
+        result = merge(copy.deepcopy(base), copy.deepcopy(nxt))
+        assert result == expected
+        assert repr(result) == repr(expected)
+
+
+def test_merge_in_place():
+    """Test that dicts are merged in place."""
+    base = {"a": {"b": [1]}, "c": 1}
+    nested = base['a']
+    nxt = {"a": {"b": [2], "d": {"e": 1}}, "c": {"f": 1}}
+    
+    assert merge(base, nxt) is base
+    assert base['a'] is nested
+    assert base == {"a": {"b": [1, 2], "d": {"e": 1}}, "c": {"f": 1}}
+    
+    # Values that are only in nxt are not copied (the same as deepmerge).
+    assert base['a']['d'] is nxt['a']['d']
+    
+    # Deeply nested dicts are not limited by recursion depth.
+    deep_base = deep_nxt = None
+    for index in range(5000):
+        deep_base = {"x": deep_base, "base": index}
+        deep_nxt = {"x": deep_nxt, "nxt": index}
+    
+    merged = merge(deep_base, deep_nxt)
+    assert merged['base'] == merged['nxt'] == 4999
@@ -0,0 +1,175 @@
+"""Tests for parsing configurables from file"""
+
+import os
+import glob
+
+import pytest
+
+from configurables.base import Configurable_class_target
+from configurables.parse import Configurables_parser, parse_loaders
+import configurables.parse
+
+
+class Parse_program(Configurable_class_target):
+    """A class to load programs into."""
+    
+    CLASS_HANDLE = ("parse_program",)
+
+
+class Parse_method(Configurable_class_target):
+    """A class to load methods into."""
+    
+    CLASS_HANDLE = ("parse_method",)
+
+
+class Parse_gaussian(Parse_program):
+    
+    CLASS_HANDLE = ("parse_gaussian",)
+
+
+class Parse_dft(Parse_method):
+    
+    CLASS_HANDLE = ("parse_dft",)
+
+
+METHOD_YAML = """
+link:
+    tag: HF
+meta:
+    name: Hartree-Fock
+---
+link:
+    tag: DFT
+    type: partial
+    next: [B3LYP]
+---
+link:
+    tag: B3LYP
+meta:
+    name: B3LYP
+    class_name: parse_dft
+"""
+
+
+PROGRAM_YAML = """
+link:
+    tag: Gaussian
+    next: [HF, [DFT, B3LYP]]
+meta:
+    name: Gaussian
+    class_name: parse_gaussian
+"""
+
+
+@pytest.fixture
+def library(tmp_path):
+    """A small library of configurable files."""
+    (tmp_path / "library").mkdir()
+    (tmp_path / "library" / "methods.yaml").write_text(METHOD_YAML)
+    (tmp_path / "library" / "update.yaml").write_text("link:\n    tag: HF\n    type: update\nmeta:\n    name: HF\n")
+    (tmp_path / "programs").mkdir()
+    (tmp_path / "programs" / "programs.yaml").write_text(PROGRAM_YAML)
+    return tmp_path
+
+
+def parse(library, cache_dir = None):
+    """Parse the test library, returning the configs and updates."""
+    parser = Configurables_parser(str(library / "library"), TYPE = "parse_method", cache_dir = cache_dir)
+    parser.parse()
+    return [loader.config for loader in parser.loaders], [update.config for update in parser.updates]
+
+
+def test_parse_cache(library, monkeypatch):
+    """Test caching parsed files on disk."""
+    cache_dir = library / "cache"
+    uncached = parse(library)
+    
+    # A cold cache parses and stores every file.
+    assert parse(library, cache_dir) == uncached
+    assert len(glob.glob(str(cache_dir / "*.pickle"))) == 2
+    
+    # A warm cache doesn't need to parse at all.
+    with monkeypatch.context() as context:
+        context.setattr(configurables.parse, "parse_yaml", lambda data: pytest.fail("file was parsed"))
+        assert parse(library, cache_dir) == uncached
+    
+    # Changed files are parsed again.
+    methods = library / "library" / "methods.yaml"
+    methods.write_text(METHOD_YAML.replace("Hartree-Fock", "HF"))
+    os.utime(methods, ns = (0, 0))
+    assert parse(library, cache_dir)[0][0]['meta']['name'] == "HF"
+    
+    # Corrupt entries are ignored (and replaced).
+    for entry in glob.glob(str(cache_dir / "*.pickle")):
+        with open(entry, "wb") as entry_file:
+            entry_file.write(b"not a pickle")
+    
+    assert parse(library, cache_dir) == parse(library)
+    assert not glob.glob(str(cache_dir / "*.tmp"))
+    
+    # A cache directory that can't be created disables the cache.
+    not_a_dir = library / "not_a_dir"
+    not_a_dir.write_text("")
+    assert parse(library, not_a_dir / "cache") == parse(library)
+
+
+def describe_loader(loader):
+    """A comparable summary of a tree of loaders."""
+    return (
+        type(loader).__name__, loader.TAG, loader.TOP, loader.config,
+        [describe_loader(child) for child in loader.NEXT],
+        [[child.TAG for child in child_path] for child_path in getattr(loader, "CHILDREN", [])],
+    )
+
+
+def test_parse_snapshot(library, monkeypatch):
+    """Test saving and loading snapshots of linked loaders."""
+    definitions = {"parse_program": [str(library / "programs")], "parse_method": [str(library / "library")]}
+    snapshot = str(library / "snapshot" / "library.pickle")
+    
+    loaded = parse_loaders(definitions)
+    expected = {TYPE: describe_loader(loader_list) for TYPE, loader_list in loaded.items()}
+    assert {TYPE: describe_loader(loader_list) for TYPE, loader_list in parse_loaders(definitions, snapshot = snapshot).items()} == expected
+    
+    # An up to date snapshot doesn't need to parse anything.
+    with monkeypatch.context() as context:
+        context.setattr(Configurables_parser, "parse", lambda self: pytest.fail("library was parsed"))
+        cached = parse_loaders(definitions, snapshot = snapshot)
+        assert {TYPE: describe_loader(loader_list) for TYPE, loader_list in cached.items()} == expected
+        
+        # Links between loaders are preserved.
+        program = cached['parse_program'].NEXT[0]
+        assert program.top_child is cached['parse_method']
+        assert program.CHILDREN[0][-1] is cached['parse_method'].NEXT[0]
+        assert program.resolve_path([program]).meta['name'] == "Gaussian"
+        assert cached['parse_method'].resolve(["DFT", "B3LYP"]).meta['name'] == "B3LYP"
+    
+    # Changed files invalidate the snapshot.
+    programs = library / "programs" / "programs.yaml"
+    programs.write_text(PROGRAM_YAML.replace("name: Gaussian", "name: Gaussian 16"))
+    os.utime(programs, ns = (0, 0))
+    assert parse_loaders(definitions, snapshot = snapshot)['parse_program'].NEXT[0].config['meta']['name'] == "Gaussian 16"
+    
+    # As do new classes.
+    fingerprint = configurables.parse.library_fingerprint(definitions)
+    class Parse_other(Configurable_class_target):
+        CLASS_HANDLE = ("parse_other",)
+    
+    assert configurables.parse.library_fingerprint(definitions) != fingerprint
+
+
+def test_parse_workers(library):
+    """Test parsing files with a pool of worker processes."""
+    for name in range(10):
+        (library / "library" / "extra_{}.yaml".format(name)).write_text("link:\n    tag: HF\n    type: update\nmeta:\n    name: HF {}\n".format(name))
+    
+    sequential = parse(library)
+    parser = Configurables_parser(str(library / "library"), TYPE = "parse_method", workers = 2)
+    parser.parse()
+    # Files are processed in the same order, so the last update still wins.
+    assert ([loader.config for loader in parser.loaders], [update.config for update in parser.updates]) == sequential
+    assert [update.config['meta']['name'] for update in parser.updates] == ["HF {}".format(name) for name in range(10)] + ["HF"]
+    
+    definitions = {"parse_program": [str(library / "programs")], "parse_method": [str(library / "library")]}
+    assert {TYPE: describe_loader(loader_list) for TYPE, loader_list in parse_loaders(definitions, workers = 2).items()} == \
+        {TYPE: describe_loader(loader_list) for TYPE, loader_list in parse_loaders(definitions).items()}
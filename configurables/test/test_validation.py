@@ -0,0 +1,282 @@
+"""Tests for compiled validation plans"""
+
+import copy
+
+import pytest
+
+from configurables.base import Configurable
+from configurables.options import Options
+from configurables.option import Option
+from configurables.validation import get_validation_plan
+from configurables.exception import Configurable_exception, Configurable_option_exception
+
+
+class Method(Configurable):
+    
+    name = Option(help = "Name", type = str, required = True)
+    charge = Option(help = "Charge", type = int, default = 0)
+    multiplicity = Option(help = "Multiplicity", type = int, default = 1, choices = [1, 2, 3])
+    keywords = Option(help = "Keywords", list_type = list, type = str)
+    functional = Option(help = "Functional", default = "B3LYP", choices = ["B3LYP", "PBE0", "CAM-B3LYP"], exclude = "post_hf")
+    post_hf = Option(help = "Post-HF method", default = None)
+    memory = Option(help = "Memory", default = None, none_to_default = True)
+    
+    dft = Options(help = "DFT options",
+        grid = Options(
+            Option("name", help = "Grid name", default = "fine", choices = ["coarse", "fine", "ultrafine"]),
+            size = Option(help = "Grid size", type = int, default = 10, validate = lambda option, configurable, value: value > 0),
+        ),
+        dispersion = Option(help = "Dispersion", default = False, type = bool),
+        validate = lambda option, configurable, value: value['grid']['size'] < 1000,
+    )
+    
+    solvent = Options(help = "Solvent options", allow_unrecognised_options = True,
+        model = Option(help = "Solvent model", default = None),
+        exclude = ["charge"],
+    )
+
+class Broken(Configurable):
+    
+    value = Option(help = "Value", default = 1, exclude = "nothing")
+
+class Nested(Configurable):
+    
+    basis = Option(help = "Basis set", default = None)
+    auxiliary = Option(help = "Auxiliary basis set", default = None, exclude = "outer")
+    
+    outer = Options(help = "Outer options",
+        inner = Options(help = "Inner options",
+            value = Option(help = "Value", default = None),
+            exclude = "other",
+        ),
+        other = Option(help = "Other", default = None),
+        exclude = "basis",
+    )
+
+
+def validate_both(cls, **kwargs):
+    """Validate a new object with both the compiled plan and the interpreted path, returning the outcome of each."""
+    results = []
+    for compiled in (True, False):
+        obj = cls(validate_now = False, **copy.deepcopy(kwargs))
+        try:
+            if compiled:
+                get_validation_plan(cls).run(obj)
+            
+            else:
+                obj.validate_children(obj, obj._configurable_options)
+            
+            results.append(("ok", obj._configurable_options))
+        
+        except Exception as e:
+            results.append((type(e), str(e), obj._configurable_options))
+    
+    return results
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"name": "test"},
+    {},
+    {"name": 12, "charge": "-1", "multiplicity": "2", "keywords": ("opt", 1)},
+    {"name": "test", "charge": "one"},
+    {"name": "test", "multiplicity": 4},
+    {"name": "test", "functional": "pbe0"},
+    {"name": "test", "functional": "b3lyp"},
+    {"name": "test", "functional": "PBE0", "post_hf": "MP2"},
+    {"name": "test", "post_hf": "MP2"},
+    {"name": "test", "memory": None},
+    {"name": None},
+    {"name": "test", "keywords": 5},
+    {"name": "test", "dft": {"grid": {"size": "20", "name": "COARSE"}, "dispersion": 1}},
+    {"name": "test", "dft": {"grid": {"size": 0}}},
+    {"name": "test", "dft": {"grid": {"size": 5000}}},
+    {"name": "test", "dft": {"grid": {}, "dispersion": False}},
+    {"name": "test", "dft": {"grid": {"shape": "round"}}},
+    {"name": "test", "dft": 5},
+    {"name": "test", "dft": {"grid": 5}},
+    {"name": "test", "solvent": {"model": "PCM", "radius": 5}},
+    {"name": "test", "solvent": {"model": "PCM"}, "charge": 1},
+])
+def test_plan_parity(kwargs):
+    """Test that compiled plans give the same results as the interpreted path."""
+    compiled, interpreted = validate_both(Method, **kwargs)
+    assert compiled == interpreted
+
+
+def test_plan_missing_exclude():
+    """Test exclusions that can't be found."""
+    compiled, interpreted = validate_both(Broken)
+    assert compiled == interpreted
+    assert "in exclude cannot be found" in compiled[1]
+
+
+def test_plan_validate():
+    """Test validation through Configurable.validate()."""
+    method = Method(name = "test", dft = {"grid": {"size": "20"}})
+    assert method.dft['grid']['size'] == 20
+    
+    method.dft['grid']['size'] = "30"
+    method.validate()
+    assert method.dft['grid']['size'] == 30
+    
+    # Plans are compiled once per class.
+    assert get_validation_plan(Method) is get_validation_plan(Method)
+
+
+def test_lazy_validation():
+    """Test validating options as they are read."""
+    method = Method(validate_now = "lazy", name = 12, charge = "one", multiplicity = "2", functional = "pbe0", dft = {"grid": {"name": "COARSE", "size": "20"}})
+    
+    # Each option is validated (and converted) when first read.
+    assert method._configurable_options['multiplicity'] == "2"
+    assert method.multiplicity == 2
+    assert method._configurable_options['multiplicity'] == 2
+    assert method.name == "12"
+    assert method.functional == "PBE0"
+    assert method.dft['grid']['name'] == "coarse"
+    assert method.dft['grid']['size'] == 20
+    assert method.dft['dispersion'] is False
+    
+    # Invalid options only raise when read (every time).
+    for _ in range(2):
+        with pytest.raises(Configurable_option_exception):
+            method.charge
+    
+    method.charge = -1
+    assert method.charge == -1
+    
+    # Once validated, a lazy configurable is the same as any other.
+    eager = Method(name = 12, charge = -1, multiplicity = "2", functional = "pbe0", dft = {"grid": {"name": "COARSE", "size": "20"}})
+    assert method.dump() == eager.dump()
+    assert method._lazy_validated is None
+    
+    # Checks involving more than one option are left to validate().
+    method = Method(validate_now = "lazy", name = "test", functional = "PBE0", post_hf = "MP2", basis = "STO-3G")
+    assert method.functional == "PBE0" and method.post_hf == "MP2"
+    with pytest.raises(Configurable_exception, match = "mutually exclusive"):
+        method.validate()
+    
+    method.post_hf = None
+    with pytest.raises(Configurable_exception, match = "unrecognised option 'basis'"):
+        method.validate()
+    
+    with pytest.raises(Configurable_exception, match = "unrecognised option 'basis'"):
+        Method(name = "test", basis = "STO-3G")
+    
+    # Lazy reads of unset nested options give the same values as eager validation.
+    class Nested(Configurable):
+        group = Options(inner = Options(items = Option(list_type = tuple, default = (), choices = ["a", "b"])))
+    
+    eager = Nested()
+    lazy = Nested(validate_now = "lazy")
+    assert lazy.group['inner']['items'] == eager.group['inner']['items'] == ()
+    assert lazy._configurable_options == eager._configurable_options
+    assert lazy.dump() == eager.dump() == {}
+
+
+def test_incremental_validation():
+    """Test that only changed options are validated again."""
+    method = Method(name = "test")
+    assert method._dirty_options == set()
+    
+    method.multiplicity = "2"
+    method.dft['grid']['size'] = "20"
+    assert method._dirty_options == {("multiplicity",), ("dft", "grid", "size")}
+    
+    # Options that haven't changed are not validated (or converted) again.
+    method._configurable_options['charge'] = "one"
+    method.validate()
+    assert method.multiplicity == 2
+    assert method.dft['grid']['size'] == 20
+    assert method._configurable_options['charge'] == "one"
+    assert method._dirty_options == set()
+    
+    # Unless asked.
+    with pytest.raises(Configurable_option_exception):
+        method.validate(full = True)
+    
+    method.charge = 0
+    method.validate()
+    
+    # Custom validate functions of containing Options are checked.
+    method.dft['grid']['size'] = 2000
+    with pytest.raises(Configurable_option_exception, match = "Validation for Options object failed"):
+        method.validate()
+    
+    # Failed options stay dirty.
+    with pytest.raises(Configurable_option_exception):
+        method.validate()
+    
+    method.dft['grid']['size'] = 20
+    method.validate()
+    
+    # Exclusions are checked in both directions.
+    method.post_hf = "MP2"
+    method.validate()
+    method.functional = "PBE0"
+    with pytest.raises(Configurable_exception, match = "mutually exclusive"):
+        method.validate()
+    
+    del method.functional
+    method.validate()
+    
+    method.charge = 1
+    method.solvent['model'] = "PCM"
+    with pytest.raises(Configurable_exception, match = "mutually exclusive"):
+        method.validate()
+    
+    # Changes to whole Options objects (or merges) can't be tracked.
+    method.solvent = {"model": None}
+    assert method._dirty_options is None
+    method.validate()
+    method.deep_merge({"charge": "one"})
+    assert method._dirty_options is None
+    with pytest.raises(Configurable_option_exception):
+        method.validate()
+
+
+def set_path(obj, path, value):
+    """Set the value of a (possibly nested) option through its Option or Options mapping."""
+    if len(path) == 1:
+        setattr(obj, path[0], value)
+        return
+    
+    target = getattr(obj, path[0])
+    for name in path[1:-1]:
+        target = target[name]
+    
+    target[path[-1]] = value
+
+
+@pytest.mark.parametrize("cls, kwargs, writes", [
+    (Method, {"name": "test", "charge": 1}, [(("solvent", "model"), "PCM")]),
+    (Method, {"name": "test", "solvent": {"model": "PCM"}}, [(("charge",), 1)]),
+    (Method, {"name": "test", "charge": 1}, [(("solvent", "model"), "PCM"), (("solvent", "model"), None)]),
+    (Method, {"name": "test", "post_hf": "MP2"}, [(("dft", "grid", "size"), 20), (("functional",), "PBE0")]),
+    (Nested, {"basis": "STO-3G"}, [(("outer", "inner", "value"), 1)]),
+    (Nested, {"basis": "STO-3G"}, [(("outer", "other"), 1)]),
+    (Nested, {"auxiliary": "def2"}, [(("outer", "inner", "value"), 1)]),
+    (Nested, {"outer": {"other": 1}}, [(("outer", "inner", "value"), 1)]),
+    (Nested, {"outer": {"inner": {"value": 1}}}, [(("outer", "other"), 1)]),
+    (Nested, {"outer": {"inner": {"value": 1}}}, [(("outer", "other"), 1), (("outer", "inner", "value"), None)]),
+    (Nested, {"outer": {"inner": {"value": 1}}}, [(("basis",), "STO-3G")]),
+    (Nested, {}, [(("outer", "inner", "value"), 1), (("basis",), "STO-3G")]),
+    (Nested, {}, [(("outer", "inner", "value"), 1), (("auxiliary",), "def2")]),
+])
+def test_incremental_validation_parity(cls, kwargs, writes):
+    """Test that validating only changed options gives the same result as validating everything, after nested writes."""
+    results = []
+    for full in (False, True):
+        obj = cls(**copy.deepcopy(kwargs))
+        for path, value in writes:
+            set_path(obj, path, value)
+        
+        try:
+            obj.validate(full = full)
+            results.append(("ok", obj._configurable_options))
+        
+        except Exception as e:
+            results.append((type(e), str(e)))
+    
+    incremental, full = results
+    assert incremental == full
@@ -0,0 +1,91 @@
+"""Tests for the yaml backends"""
+
+from pathlib import Path
+
+import pytest
+
+from configurables import yaml_io
+from configurables.base import Configurable_class_target
+from configurables.option import Option, Nested_dict_type
+from configurables.options import Options
+from configurables.parse import parse_loaders
+
+
+# A corpus of configurable files that use a wide range of yaml features.
+CORPUS = Path(__file__).parent / "corpus"
+
+
+class Corpus_programs(Configurable_class_target):
+    
+    CLASS_HANDLE = ("corpus_programs",)
+
+
+class Corpus_program(Corpus_programs):
+    
+    CLASS_HANDLE = ("corpus_program",)
+    
+    description = Option(help = "Description", type = str, default = "")
+    executable = Option(help = "Executable", default = None)
+    memory = Option(help = "Memory", type = float, default = 0.0)
+
+
+class Corpus_methods(Configurable_class_target):
+    
+    CLASS_HANDLE = ("corpus_methods",)
+
+
+class Corpus_method(Corpus_methods):
+    
+    CLASS_HANDLE = ("corpus_method",)
+    
+    functional = Option(help = "Functional", type = str, default = "HF")
+    keywords = Option(help = "Keywords", list_type = list, type = str, default = ())
+    charge = Option(help = "Charge", type = int, default = 0)
+    grid = Options(help = "Grid",
+        size = Option(help = "Size", type = int, default = 50),
+        pruned = Option(help = "Pruned", type = bool, default = True),
+    )
+    extra = Option(help = "Extra options", type = Nested_dict_type, default = None)
+
+
+def load_corpus(backend):
+    """Load every configurable in the corpus using a given yaml backend."""
+    yaml_io.set_backend(backend)
+    try:
+        library = parse_loaders({"corpus_programs": [str(CORPUS / "programs")], "corpus_methods": [str(CORPUS / "methods")]})
+        loaded = {}
+        for TYPE, loader_list in library.items():
+            configurables = [loader_list.resolve(index) for index in range(1, loader_list.size() +1)]
+            # The two emitters are allowed to format text differently (long quoted strings are folded differently, for example),
+            # so dumped text is compared by what it loads as.
+            loaded[TYPE] = [(configurable.tag_hierarchy, configurable.dump(True), yaml_io.safe_load(str(configurable))) for configurable in configurables]
+        
+        return loaded
+    
+    finally:
+        yaml_io.set_backend()
+
+
+@pytest.mark.skipif(not yaml_io.HAS_LIBYAML, reason = "PyYAML has been built without libyaml")
+def test_backend_conformance():
+    """Test that the C and Python yaml backends produce the same configurables."""
+    python = load_corpus("python")
+    assert len(python['corpus_programs']) == 2
+    assert len(python['corpus_methods']) == 3
+    assert load_corpus("c") == python
+
+
+def test_set_backend():
+    """Test choosing yaml backends."""
+    try:
+        yaml_io.set_backend("python")
+        assert yaml_io.get_backend() == "python"
+        assert yaml_io.safe_load(yaml_io.safe_dump({"a": [1, 2.5, None]})) == {"a": [1, 2.5, None]}
+        
+        with pytest.raises(ValueError):
+            yaml_io.set_backend("fortran")
+    
+    finally:
+        yaml_io.set_backend()
+    
+    assert yaml_io.get_backend() == ("c" if yaml_io.HAS_LIBYAML else "python")
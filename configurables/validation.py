@@ -0,0 +1,186 @@
+"""
+Compiled validation plans for Configurable classes.
+
+Validating a configurable walks its tree of Options, looking up the child options, exclusions and known option names at each level.
+None of this depends on the values being validated, so it is worked out once per class and stored as a flat, ordered list of steps.
+Running the plan then needs no recursion and no repeated option lookups, but performs the same checks (in the same order) as validate_children().
+"""
+
+import weakref
+
+from configurables.exception import Configurable_exception,\
+    Configurable_option_exception
+from configurables.option import Option
+from configurables.options import Options, Options_mixin, Options_mapping
+
+
+# Step codes.
+# Validate a single option (or an Options object that we can't flatten).
+VALIDATE = 0
+# Descend into the sub dict of an Options object.
+ENTER = 1
+# Return from the sub dict of an Options object, calling its custom validate function.
+EXIT = 2
+# Check a pair of mutually exclusive options.
+EXCLUDE = 3
+# An option lists an exclusion that doesn't exist.
+MISSING_EXCLUDE = 4
+# Check for unrecognised options in the current dict.
+UNRECOGNISED = 5
+
+# Speed hack for get_validation_plan(), compiled plans keyed by class.
+_plan_db = weakref.WeakKeyDictionary()
+
+
+def get_validation_plan(cls):
+    """
+    Get the (cached) validation plan for a Configurable class.
+    
+    :param cls: The Configurable class to get a plan for.
+    :returns: The Validation_plan, or None if the class customises validation in a way that can't be compiled (in which case validate_children() should be used instead).
+    """
+    try:
+        return _plan_db[cls]
+    
+    except KeyError:
+        plan = Validation_plan(cls) if Validation_plan.supports(cls) else None
+        _plan_db[cls] = plan
+        return plan
+
+
+def is_flat_options(option):
+    """
+    Whether an option is an Options object that uses the standard validation mechanism (and so can be flattened into a plan).
+    """
+    option_cls = type(option)
+    return isinstance(option, Options) and \
+        option_cls.validate is Options.validate and \
+        option_cls.validate_children is Options_mixin.validate_children
+
+
+def is_default_validate(option):
+    """
+    Whether the custom validate function of an option is the default (which always passes).
+    """
+    return getattr(option._validate, "__func__", None) is Option.default_validate
+
+
+class Validation_plan():
+    """
+    A flat, ordered list of the steps needed to validate a Configurable class.
+    """
+    
+    @classmethod
+    def supports(self, cls):
+        """
+        Whether a validation plan can be compiled for a given Configurable class.
+        
+        Classes that override the mechanism used to find or validate their top-level options are not supported.
+        """
+        return cls.validate_children is Options_mixin.validate_children and \
+            cls.get_options is Options_mixin.get_options
+    
+    def __init__(self, owning_cls):
+        """
+        Constructor for Validation_plan objects.
+        
+        :param owning_cls: The Configurable class to compile a plan for.
+        """
+        self.owning_cls = owning_cls
+        self.steps = []
+        self.compile_level(None, owning_cls.get_cls_options())
+    
+    def compile_level(self, container, options):
+        """
+        Compile the steps needed to validate one level of options.
+        
+        :param container: The Options object that contains options, or None for the top level (the configurable itself).
+        :param options: Dict of the options at this level.
+        """
+        # First, each of our known options.
+        for option in options.values():
+            if is_flat_options(option):
+                self.steps.append((ENTER, option))
+                self.compile_level(option, option.get_options(self.owning_cls))
+                self.steps.append((EXIT, option, is_default_validate(option)))
+            
+            else:
+                self.steps.append((VALIDATE, option.validate))
+        
+        # Next, exclusions (see validate_children() for why this is a separate loop).
+        for option in options.values():
+            for exclusion in option.exclude:
+                if exclusion in options:
+                    self.steps.append((EXCLUDE, option, options[exclusion]))
+                
+                else:
+                    self.steps.append((MISSING_EXCLUDE, option, exclusion))
+        
+        # Finally, unrecognised options.
+        self.steps.append((UNRECOGNISED, container, frozenset(options)))
+    
+    def run(self, owning_obj):
+        """
+        Validate a configurable object according to this plan.
+        
+        :param owning_obj: The configurable object to validate (an instance of the class this plan was compiled for).
+        """
+        dict_obj = owning_obj._configurable_options
+        # Dicts of the levels above the current one.
+        parents = []
+        
+        # First, prune empty values.
+        # Every dict reachable from the top is pruned here, so (unlike validate_children()) nested dicts are not pruned again.
+        owning_obj.prune(owning_obj, dict_obj)
+        
+        for step in self.steps:
+            code = step[0]
+            
+            if code == VALIDATE:
+                step[1](owning_obj, dict_obj)
+            
+            elif code == ENTER:
+                option = step[1]
+                # Our children will find their values in a different dict to where we find ourself.
+                sub_dict_obj = dict_obj.get(option.name, {})
+                
+                if isinstance(sub_dict_obj, Options_mapping):
+                    # The sub dict is a reference to another configurable option, see Options.validate().
+                    dict_obj[option.name] = dict(sub_dict_obj)
+                    # This mapping wasn't pruned above.
+                    option.prune(owning_obj, sub_dict_obj)
+                
+                elif not isinstance(sub_dict_obj, dict):
+                    raise Configurable_option_exception(owning_obj, option, "Options objects can only accept nested options as values, not the single value '{}'".format(sub_dict_obj))
+                
+                parents.append(dict_obj)
+                dict_obj = sub_dict_obj
+            
+            elif code == EXIT:
+                option = step[1]
+                dict_obj = parents.pop()
+                
+                # Call the custom validate function if given.
+                if not step[2] and not option._validate(option, owning_obj, option.get_from_dict(owning_obj, dict_obj)):
+                    raise Configurable_option_exception(owning_obj, option, "Validation for Options object failed")
+            
+            elif code == EXCLUDE:
+                option, exclusion = step[1], step[2]
+                if not exclusion.is_default(owning_obj, dict_obj) and not option.is_default(owning_obj, dict_obj):
+                    raise Configurable_exception(owning_obj, "options '{}' and '{}' cannot be set at the same time (mutually exclusive)".format(option.name, exclusion.name))
+            
+            elif code == MISSING_EXCLUDE:
+                raise Configurable_option_exception(owning_obj, step[1], "The option '{}' in exclude cannot be found".format(step[2]))
+            
+            else:
+                container = step[1] if step[1] is not None else owning_obj
+                
+                if not container.allow_unrecognised_options:
+                    for unexpected_key in set(dict_obj).difference(step[2]):
+                        # Although this looks like a loop, we will obviously only raise the first exception.
+                        msg = "unrecognised option '{}' with value '{}'".format(unexpected_key, dict_obj[unexpected_key])
+                        if hasattr(container, "is_configurable"):
+                            raise Configurable_exception(owning_obj, msg)
+                        
+                        else:
+                            raise Configurable_option_exception(owning_obj, container, msg)
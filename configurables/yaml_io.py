@@ -0,0 +1,80 @@
+"""
+Reading and writing of yaml.
+
+All yaml I/O should go through the functions here, which mirror those of PyYAML of the same name.
+When PyYAML has been built with libyaml, the (much faster) C loader and dumper are used automatically.
+"""
+
+import yaml
+
+
+# Whether the C (libyaml) backend is available.
+HAS_LIBYAML = getattr(yaml, "__with_libyaml__", False)
+
+# The loader and dumper classes in use, see set_backend().
+_Loader = yaml.SafeLoader
+_Dumper = yaml.SafeDumper
+
+
+def set_backend(backend = "auto"):
+    """
+    Choose which yaml backend to use.
+    
+    :raises ValueError: If backend is not recognised, or is "c" but PyYAML has been built without libyaml.
+    :param backend: One of "auto" (use libyaml if available), "c" (always use libyaml) or "python" (always use the pure Python implementation).
+    """
+    global _Loader, _Dumper
+    
+    if backend == "auto":
+        use_c = HAS_LIBYAML
+    
+    elif backend == "c":
+        if not HAS_LIBYAML:
+            raise ValueError("Cannot use the 'c' yaml backend; PyYAML has been built without libyaml")
+        
+        use_c = True
+    
+    elif backend == "python":
+        use_c = False
+    
+    else:
+        raise ValueError("yaml backend '{}' is not recognised, should be one of 'auto', 'c' or 'python'".format(backend))
+    
+    _Loader = yaml.CSafeLoader if use_c else yaml.SafeLoader
+    _Dumper = yaml.CSafeDumper if use_c else yaml.SafeDumper
+
+
+def get_backend():
+    """
+    Get the name of the yaml backend in use, either "c" or "python".
+    """
+    return "c" if _Loader is not yaml.SafeLoader else "python"
+
+
+def safe_load(stream):
+    """
+    Parse the first document in a stream (a string or file), producing only simple python objects.
+    """
+    return yaml.load(stream, Loader = _Loader)
+
+
+def safe_load_all(stream):
+    """
+    Parse all documents in a stream (a string or file), producing only simple python objects.
+    
+    :returns: A generator of documents.
+    """
+    return yaml.load_all(stream, Loader = _Loader)
+
+
+def safe_dump(data, stream = None, **kwargs):
+    """
+    Serialise a python object (containing only simple python objects) to yaml.
+    
+    :param stream: An optional stream to write to. If not given, the yaml is returned as a string.
+    :param kwargs: Additional options passed to the dumper, see yaml.dump().
+    """
+    return yaml.dump_all([data], stream, Dumper = _Dumper, **kwargs)
+
+
+set_backend()